@@ -0,0 +1,25 @@
+"""The article type shared by the scrapers, ingestion and the JSON API.
+
+Scraped listings, feed entries and stored rows all become an ``Article``, so
+every endpoint returns the same keys: ``url``, ``image_url``,
+``description`` and ``published_at``. It is a slotted dataclass, so a large
+list costs far less memory than the equivalent dicts. orjson serializes it
+directly, including ``published_at``, which is why the API responds with
+ORJSONResponse.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass(slots=True)
+class Article:
+    title: Optional[str]
+    url: Optional[str]
+    source: Optional[str] = None
+    author: Optional[str] = None
+    description: Optional[str] = None
+    image_url: Optional[str] = None
+    published_at: Optional[datetime] = None
+    # Primary key once stored
+    id: Optional[int] = None
@@ -0,0 +1,161 @@
+"""TTL cache with stale-while-revalidate for scraped news, keyed by source.
+
+Fresh entries are returned directly. Stale entries (older than the TTL but
+within the stale window) are returned immediately while a single background
+refresh runs. Misses are coalesced so concurrent callers share one upstream
+fetch. Entries live in memory by default; set ``NEWS_CACHE_BACKEND=redis``
+to share them between workers.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import orjson
+from decouple import config
+
+from .metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+NEWS_CACHE_TTL = config('NEWS_CACHE_TTL', default=300, cast=int)
+NEWS_CACHE_STALE_TTL = config('NEWS_CACHE_STALE_TTL', default=3600, cast=int)
+NEWS_CACHE_BACKEND = config('NEWS_CACHE_BACKEND', default='memory')
+NEWS_CACHE_REDIS_URL = config('NEWS_CACHE_REDIS_URL', default='redis://localhost:6379/0')
+
+# (stored_at, value)
+CacheEntry = Tuple[float, Any]
+
+
+class MemoryBackend:
+    """Per-process dict backend"""
+
+    def __init__(self):
+        self._entries: Dict[str, CacheEntry] = {}
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        return self._entries.get(key)
+
+    async def set(self, key: str, entry: CacheEntry, expire: int):
+        self._entries[key] = entry
+
+    async def delete(self, key: str):
+        self._entries.pop(key, None)
+
+
+class RedisBackend:
+    """
+    Redis backend so several workers share the cached results. Values are
+    stored as JSON, so cached Articles come back as dicts with the same keys.
+    """
+
+    def __init__(self, url: str, prefix: str = "news-cache:"):
+        import redis.asyncio as redis  # optional dependency
+
+        self._redis = redis.from_url(url)
+        self._prefix = prefix
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        raw = await self._redis.get(self._prefix + key)
+        if raw is None:
+            return None
+        data = orjson.loads(raw)
+        return data["stored_at"], data["value"]
+
+    async def set(self, key: str, entry: CacheEntry, expire: int):
+        stored_at, value = entry
+        payload = orjson.dumps({"stored_at": stored_at, "value": value})
+        await self._redis.set(self._prefix + key, payload, ex=expire)
+
+    async def delete(self, key: str):
+        await self._redis.delete(self._prefix + key)
+
+
+class NewsCache:
+    def __init__(self, ttl: int = NEWS_CACHE_TTL, stale_ttl: int = NEWS_CACHE_STALE_TTL, backend=None,
+                 name: str = "news"):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.backend = backend or MemoryBackend()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.counters = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+        }
+
+    async def get_or_fetch(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for ``key``, loading it with ``loader`` if needed"""
+        entry = await self.backend.get(key)
+        if entry is not None:
+            stored_at, value = entry
+            age = time.time() - stored_at
+            if age < self.ttl:
+                self.counters["hits"] += 1
+                CACHE_LOOKUPS.labels(self.name, "hit").inc()
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self.counters["stale_hits"] += 1
+                CACHE_LOOKUPS.labels(self.name, "stale").inc()
+                self._refresh(key, loader)
+                return value
+
+        self.counters["misses"] += 1
+        CACHE_LOOKUPS.labels(self.name, "miss").inc()
+        return await asyncio.shield(self._refresh(key, loader))
+
+    async def invalidate(self, key: str):
+        await self.backend.delete(key)
+
+    def _refresh(self, key: str, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Start a refresh for ``key`` unless one is already running"""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.counters["coalesced"] += 1
+            return task
+
+        task = asyncio.create_task(self._load(key, loader))
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._refresh_done(key, t))
+        return task
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        self.counters["refreshes"] += 1
+        value = await loader()
+        await self.backend.set(key, (time.time(), value), self.ttl + self.stale_ttl)
+        return value
+
+    def _refresh_done(self, key: str, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            self.counters["refresh_errors"] += 1
+            logger.warning("Cache refresh for %s failed: %s", key, error)
+
+    def stats(self) -> dict:
+        lookups = self.counters["hits"] + self.counters["stale_hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_ratio": round((lookups - self.counters["misses"]) / lookups, 3) if lookups else None,
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "backend": type(self.backend).__name__,
+        }
+
+
+def _make_backend():
+    if NEWS_CACHE_BACKEND == 'redis':
+        try:
+            return RedisBackend(NEWS_CACHE_REDIS_URL)
+        except ImportError:
+            logger.warning("NEWS_CACHE_BACKEND=redis but redis is not installed; using memory")
+    return MemoryBackend()
+
+
+news_cache = NewsCache(backend=_make_backend())
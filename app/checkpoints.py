@@ -0,0 +1,80 @@
+"""Per-source high-water marks for incremental ingestion.
+
+A checkpoint remembers the newest published timestamp and the most recent
+GUIDs/links seen for a source, so the scrapers can skip entries that were
+already ingested and stop paginating early. Observations made during a run
+only become part of the mark once the scheduler has stored the articles.
+"""
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+# How many recent GUIDs/links to remember per source
+RECENT_IDS_LIMIT = 200
+
+
+class Checkpoint:
+    def __init__(self, source: str, last_published_at: Optional[datetime] = None,
+                 recent_ids: Iterable[str] = ()):
+        self.source = source
+        self.last_published_at = last_published_at
+        self.recent_ids: List[str] = list(recent_ids)
+        self._known = set(self.recent_ids)
+        self._pending_ids: List[str] = []
+        self._pending_published: Optional[datetime] = None
+
+    @property
+    def is_empty(self) -> bool:
+        return not self._known and self.last_published_at is None
+
+    @property
+    def has_pending(self) -> bool:
+        return bool(self._pending_ids)
+
+    def is_known(self, ident: Optional[str], published: Optional[datetime] = None) -> bool:
+        """True if the item was ingested before or is older than the mark"""
+        if ident and ident in self._known:
+            return True
+        return bool(published and self.last_published_at and published < self.last_published_at)
+
+    def observe(self, ident: Optional[str], published: Optional[datetime] = None):
+        """Record a new item seen in this run"""
+        if ident:
+            self._pending_ids.append(ident)
+        if published and (self._pending_published is None or published > self._pending_published):
+            self._pending_published = published
+
+    def absorb(self, other: "Checkpoint"):
+        """Take over the observations recorded on a copy of this checkpoint"""
+        for ident in other._pending_ids:
+            self.observe(ident)
+        self.observe(None, other._pending_published)
+
+    def advance(self):
+        """Fold this run's observations into the mark"""
+        merged = []
+        seen = set()
+        for ident in self._pending_ids + self.recent_ids:
+            if ident not in seen:
+                seen.add(ident)
+                merged.append(ident)
+        self.recent_ids = merged[:RECENT_IDS_LIMIT]
+        self._known = set(self.recent_ids)
+        if self._pending_published and (
+            self.last_published_at is None or self._pending_published > self.last_published_at
+        ):
+            self.last_published_at = self._pending_published
+        self._pending_ids = []
+        self._pending_published = None
+
+
+class CheckpointStore:
+    """Checkpoints for all sources in one ingestion run"""
+
+    def __init__(self, checkpoints: Optional[Dict[str, Checkpoint]] = None):
+        self.checkpoints: Dict[str, Checkpoint] = checkpoints or {}
+
+    def get(self, source: str) -> Checkpoint:
+        checkpoint = self.checkpoints.get(source)
+        if checkpoint is None:
+            checkpoint = self.checkpoints[source] = Checkpoint(source)
+        return checkpoint
@@ -0,0 +1,62 @@
+"""Create the tables and indexes the app adds to the database.
+
+Run it once per deploy, before the new code serves traffic:
+
+    python -m app.database.migrate
+
+The Django-managed tables already exist in production, so create_all leaves
+them alone and their newer indexes are added one by one. On Postgres each
+index is built with ``CREATE INDEX CONCURRENTLY IF NOT EXISTS``, so a big
+table keeps taking writes while its index builds. An earlier concurrent
+build that failed leaves an invalid index behind; it is dropped and rebuilt.
+Every step is idempotent, so a re-run only creates what is missing.
+"""
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateIndex
+
+from .database import Base, engine
+
+logger = logging.getLogger(__name__)
+
+
+def _invalid_postgres_index(conn, name: str) -> bool:
+    return bool(conn.execute(text(
+        "SELECT NOT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+        "WHERE c.relname = :name"
+    ), {"name": name}).scalar())
+
+
+def create_indexes(bind: Engine):
+    if bind.dialect.name != "postgresql":
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=bind, checkfirst=True)
+        return
+
+    # CONCURRENTLY cannot run inside a transaction block
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                if _invalid_postgres_index(conn, index.name):
+                    logger.warning("Rebuilding invalid index %s", index.name)
+                    conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+                index.dialect_kwargs["postgresql_concurrently"] = True
+                conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+def migrate(bind: Engine = engine):
+    from .. import models  # noqa: F401 - registers the models on Base
+    from ..search import init_search_index
+
+    Base.metadata.create_all(bind=bind)
+    create_indexes(bind)
+    init_search_index(bind)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    migrate()
+    logger.info("Database is up to date")
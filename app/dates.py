@@ -0,0 +1,153 @@
+"""Normalization of scraped publication dates to UTC datetimes.
+
+Sources publish dates in one known shape: RSS feeds use RFC 822
+("Mon, 06 Sep 2021 16:45:00 +0000") and PCWorld listings use relative
+strings ("3 hours ago"). ``SOURCE_DATE_FORMATS`` declares that shape per
+source so its parser runs first. Other sources are learned: the parser that
+last worked for a source is tried first on its next date.
+
+Parsed results are memoized per string. A relative string is memoized as its
+offset, which is applied to one ``now`` per batch. dateutil's general
+parser is only the last resort.
+"""
+import re
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from dateutil.parser import parse as dateutil_parse
+from dateutil.relativedelta import relativedelta
+
+RELATIVE = "relative"
+RFC822 = "rfc822"
+ISO8601 = "iso8601"
+GENERIC = "generic"
+
+SOURCE_DATE_FORMATS = {
+    "PCWorld": RELATIVE,
+    "TechCrunch": RFC822,
+    "Ars Technica": RFC822,
+    "The Verge": ISO8601,
+    "Dev.to": RFC822,
+}
+DATE_MEMO_SIZE = 4096
+
+# A prefix match, as before: "3 hours ago · Updated" is still three hours ago
+_RELATIVE = re.compile(r"\s*(\d+|an?)\s+(second|minute|hour|day|week|month|year)s?\s+ago", re.IGNORECASE)
+_UNITS = {
+    "second": "seconds",
+    "minute": "minutes",
+    "hour": "hours",
+    "day": "days",
+    "week": "weeks",
+    "month": "months",
+    "year": "years",
+}
+
+
+def _utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    """
+    ``value`` as naive UTC, the form the DateTime (WITHOUT TIME ZONE)
+    columns take; asyncpg rejects aware datetimes for them.
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _parse_relative(value: str) -> Optional[relativedelta]:
+    match = _RELATIVE.match(value)
+    if not match:
+        return None
+    amount = match.group(1).lower()
+    count = 1 if amount in ("a", "an") else int(amount)
+    return relativedelta(**{_UNITS[match.group(2).lower()]: count})
+
+
+def _parse_rfc822(value: str) -> Optional[datetime]:
+    try:
+        return _utc(parsedate_to_datetime(value))
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _parse_iso8601(value: str) -> Optional[datetime]:
+    try:
+        return _utc(datetime.fromisoformat(value.strip()))
+    except ValueError:
+        return None
+
+
+def _parse_generic(value: str) -> Optional[datetime]:
+    try:
+        return _utc(dateutil_parse(value))
+    except (ValueError, OverflowError):
+        return None
+
+
+PARSERS: Dict[str, Callable[[str], object]] = {
+    RELATIVE: _parse_relative,
+    RFC822: _parse_rfc822,
+    ISO8601: _parse_iso8601,
+    GENERIC: _parse_generic,
+}
+# Cheapest and most specific first; the generic parser also accepts junk
+_AUTO_ORDER = (RELATIVE, RFC822, ISO8601, GENERIC)
+
+
+@lru_cache(maxsize=DATE_MEMO_SIZE)
+def _parse(value: str, order: Tuple[str, ...]) -> Tuple[Optional[str], object]:
+    """(format that matched, datetime or relativedelta) for ``value``"""
+    for fmt in order:
+        parsed = PARSERS[fmt](value)
+        if parsed is not None:
+            return fmt, parsed
+    return None, None
+
+
+class DateNormalizer:
+    def __init__(self, formats: Optional[Dict[str, str]] = None):
+        self.formats = dict(SOURCE_DATE_FORMATS if formats is None else formats)
+        # Source -> format last seen working, for sources not declared above
+        self.learned: Dict[str, str] = {}
+
+    def _order(self, source: Optional[str]) -> Tuple[str, ...]:
+        first = self.formats.get(source) or self.learned.get(source)
+        if first is None:
+            return _AUTO_ORDER
+        return (first,) + tuple(fmt for fmt in _AUTO_ORDER if fmt != first)
+
+    def normalize(self, value: Optional[str], source: Optional[str] = None,
+                  now: Optional[datetime] = None) -> Optional[datetime]:
+        """UTC datetime for a scraped date string, or None if it is unparseable"""
+        if not value:
+            return None
+        fmt, parsed = _parse(value, self._order(source))
+        if fmt is None:
+            return None
+        if source is not None and source not in self.formats:
+            self.learned[source] = fmt
+        if isinstance(parsed, relativedelta):
+            return (now or datetime.now(timezone.utc)) - parsed
+        return parsed
+
+    def normalize_many(self, values: Iterable[Optional[str]], source: Optional[str] = None,
+                       now: Optional[datetime] = None) -> List[Optional[datetime]]:
+        """Normalize a batch of one source's dates against a single ``now``"""
+        now = now or datetime.now(timezone.utc)
+        return [self.normalize(value, source, now) for value in values]
+
+    def stats(self) -> dict:
+        info = _parse.cache_info()
+        return {"memo_hits": info.hits, "memo_misses": info.misses, "memo_size": info.currsize,
+                "learned": dict(self.learned)}
+
+
+date_normalizer = DateNormalizer()
@@ -0,0 +1,319 @@
+"""Near-duplicate detection for ingested articles.
+
+Before insert, every article gets two fingerprints:
+
+* its canonical URL, with tracking parameters, AMP variants, ``www.`` and
+  fragments stripped, so one story is not stored under several links;
+* a 64-bit SimHash over its title and excerpt. Syndicated copies of a story
+  land within a few bits of each other.
+
+Both are persisted in ``aipc_diagnosis_articlefingerprint`` and mirrored in a
+per-process in-memory index. That index splits each SimHash into
+``SIMHASH_MAX_DISTANCE + 1`` bands, so any two hashes within the distance
+share at least one band exactly. A lookup is one dict probe per band plus
+a popcount per candidate, independent of how many articles are stored.
+Matches are dropped before insert.
+"""
+import hashlib
+import logging
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from decouple import config
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .dates import to_naive_utc
+from .models import ArticleFingerprint, NewsArticle
+from .retention import RETENTION_DAYS
+
+logger = logging.getLogger(__name__)
+
+DEDUPE_ENABLED = config('DEDUPE_ENABLED', default=True, cast=bool)
+# Articles whose SimHashes differ in at most this many bits are duplicates
+SIMHASH_MAX_DISTANCE = config('SIMHASH_MAX_DISTANCE', default=3, cast=int)
+# Texts with fewer word shingles than this are only matched by URL
+SIMHASH_MIN_FEATURES = 4
+# Characters of the excerpt hashed along with the title
+DEDUPE_EXCERPT_CHARS = 500
+BACKFILL_BATCH_SIZE = 1000
+# Seconds between sweeps of expired entries out of the in-memory index
+INDEX_PRUNE_INTERVAL = 3600
+
+TRACKING_PARAMS = frozenset([
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "igshid",
+    "mc_cid", "mc_eid", "_ga", "_gl", "ref", "ref_src", "ref_url", "cmpid",
+    "ito", "spm", "ncid", "sr_share", "amp", "outputtype", "output",
+])
+TRACKING_PREFIXES = ("utm_", "pk_", "hmb_", "mtm_", "oly_")
+_AMP_PATH = re.compile(r"(/amp)+/?$|\.amp(?=\.html?$|$)")
+_AMP_CACHE_PATH = re.compile(r"^/[cv]/(s/)?")
+_WORD = re.compile(r"\w+")
+
+DEDUPE_STATS = {"canonical_duplicates": 0, "near_duplicates": 0, "backfilled": 0}
+
+
+# ---------- Fingerprints ----------
+
+def canonicalize_url(url: str) -> str:
+    """Normalized form of ``url`` that is shared by its tracking and AMP variants"""
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    path = parts.path
+
+    # Google AMP cache: https://example-com.cdn.ampproject.org/c/s/example.com/story
+    if host.endswith(".cdn.ampproject.org") and _AMP_CACHE_PATH.match(path):
+        return canonicalize_url("https://" + _AMP_CACHE_PATH.sub("", path, count=1))
+
+    for prefix in ("www.", "amp.", "m."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    path = _AMP_PATH.sub("", re.sub(r"/{2,}", "/", path)).rstrip("/") or "/"
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    scheme = "https" if parts.scheme in ("http", "https") else parts.scheme.lower()
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+def simhash(text: str) -> Optional[int]:
+    """64-bit SimHash over word bigrams of ``text``; None if it is too short"""
+    words = _WORD.findall(text.lower())
+    features = [f"{a} {b}" for a, b in zip(words, words[1:])]
+    if len(features) < SIMHASH_MIN_FEATURES:
+        return None
+    # Column-wise bit counts over the features' hashes, as binary strings,
+    # keep the per-bit tally in C rather than a 64-step Python loop per feature
+    bits = [format(int.from_bytes(hashlib.blake2b(f.encode(), digest_size=8).digest(), "big"), "064b")
+            for f in features]
+    majority = len(bits) / 2
+    return int("".join("1" if column.count("1") > majority else "0" for column in zip(*bits)), 2)
+
+
+def article_simhash(title: Optional[str], description: Optional[str]) -> Optional[int]:
+    return simhash(f"{title or ''} {(description or '')[:DEDUPE_EXCERPT_CHARS]}")
+
+
+def _to_signed(value: Optional[int]) -> Optional[int]:
+    if value is None:
+        return None
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _to_unsigned(value: Optional[int]) -> Optional[int]:
+    if value is None:
+        return None
+    return value + (1 << 64) if value < 0 else value
+
+
+# ---------- In-memory index ----------
+
+class SimHashIndex:
+    """SimHashes split into bands; hashes within ``max_distance`` share a band"""
+
+    def __init__(self, max_distance: int = SIMHASH_MAX_DISTANCE):
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        edges = [64 * i // bands for i in range(bands + 1)]
+        self._bands = [(start, (1 << (end - start)) - 1) for start, end in zip(edges, edges[1:])]
+        self._buckets: List[Dict[int, Set[int]]] = [{} for _ in self._bands]
+        self._hashes: Dict[int, int] = {}
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def _keys(self, value: int):
+        for (shift, mask), buckets in zip(self._bands, self._buckets):
+            yield buckets, value >> shift & mask
+
+    def add(self, key: int, value: int):
+        self.remove(key)
+        self._hashes[key] = value
+        for buckets, band in self._keys(value):
+            buckets.setdefault(band, set()).add(key)
+
+    def remove(self, key: int):
+        value = self._hashes.pop(key, None)
+        if value is None:
+            return
+        for buckets, band in self._keys(value):
+            members = buckets.get(band)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del buckets[band]
+
+    def find(self, value: int) -> Optional[int]:
+        """Key of a stored hash within ``max_distance`` bits of ``value``"""
+        for buckets, band in self._keys(value):
+            for key in buckets.get(band, ()):
+                if (self._hashes[key] ^ value).bit_count() <= self.max_distance:
+                    return key
+        return None
+
+
+class FingerprintIndex:
+    """
+    Per-process mirror of the fingerprint table. ``refresh`` pulls rows
+    added since the last call, including other workers' inserts, and drops
+    entries past retention.
+    """
+
+    def __init__(self, max_distance: int = SIMHASH_MAX_DISTANCE):
+        self.simhashes = SimHashIndex(max_distance)
+        self.canonical_urls: Dict[str, int] = {}
+        self._entries: Dict[int, Tuple[str, datetime]] = {}
+        self._last_article_id = 0
+        self._backfilled = False
+        self._pruned_at = 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, article_id: int, canonical_url: str, value: Optional[int], published_at: datetime):
+        self._entries[article_id] = (canonical_url, to_naive_utc(published_at))
+        self.canonical_urls.setdefault(canonical_url, article_id)
+        if value is not None:
+            self.simhashes.add(article_id, value)
+        self._last_article_id = max(self._last_article_id, article_id)
+
+    def remove(self, article_id: int):
+        entry = self._entries.pop(article_id, None)
+        if entry is None:
+            return
+        if self.canonical_urls.get(entry[0]) == article_id:
+            del self.canonical_urls[entry[0]]
+        self.simhashes.remove(article_id)
+
+    def match(self, canonical_url: str, value: Optional[int]) -> Tuple[Optional[str], Optional[int]]:
+        """(kind, article id) of a stored duplicate; kind is 'canonical' or 'near'"""
+        article_id = self.canonical_urls.get(canonical_url)
+        if article_id is not None:
+            return "canonical", article_id
+        if value is not None:
+            article_id = self.simhashes.find(value)
+            if article_id is not None:
+                return "near", article_id
+        return None, None
+
+    def prune(self, cutoff: datetime):
+        expired = [article_id for article_id, (_, published) in self._entries.items() if published < cutoff]
+        for article_id in expired:
+            self.remove(article_id)
+
+    async def refresh(self, db: AsyncSession):
+        if not self._backfilled:
+            await backfill_fingerprints(db)
+            self._backfilled = True
+        cutoff = datetime.utcnow() - timedelta(days=RETENTION_DAYS)
+        rows = (await db.execute(
+            select(
+                ArticleFingerprint.article_id, ArticleFingerprint.canonical_url,
+                ArticleFingerprint.simhash, ArticleFingerprint.published_at,
+            )
+            .where(ArticleFingerprint.article_id > self._last_article_id)
+            .where(ArticleFingerprint.published_at >= cutoff)
+        )).all()
+        for article_id, canonical_url, value, published_at in rows:
+            self.add(article_id, canonical_url, _to_unsigned(value), published_at)
+        if time.monotonic() - self._pruned_at > INDEX_PRUNE_INTERVAL:
+            self.prune(cutoff)
+            self._pruned_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            **DEDUPE_STATS,
+            "enabled": DEDUPE_ENABLED,
+            "indexed": len(self._entries),
+            "max_distance": self.simhashes.max_distance,
+        }
+
+
+fingerprint_index = FingerprintIndex()
+
+
+# ---------- Ingestion hooks ----------
+
+def fingerprint_row(row: dict) -> dict:
+    """ArticleFingerprint values for a NewsArticle row (article_id filled on insert)"""
+    return {
+        "canonical_url": canonicalize_url(row["url"]),
+        "simhash": article_simhash(row["title"], row.get("description")),
+        "published_at": row["published_at"],
+    }
+
+
+async def drop_near_duplicates(db: AsyncSession, rows: List[dict]) -> Tuple[List[dict], List[dict]]:
+    """
+    Remove rows that duplicate a stored article or an earlier row of the
+    batch. Returns the kept rows and their fingerprints, in the same order.
+    """
+    if not DEDUPE_ENABLED:
+        return rows, [fingerprint_row(row) for row in rows]
+    await fingerprint_index.refresh(db)
+
+    batch = FingerprintIndex(fingerprint_index.simhashes.max_distance)
+    kept, fingerprints = [], []
+    for position, row in enumerate(rows):
+        fp = fingerprint_row(row)
+        kind, article_id = fingerprint_index.match(fp["canonical_url"], fp["simhash"])
+        if kind is None:
+            kind, article_id = batch.match(fp["canonical_url"], fp["simhash"])
+        if kind is not None:
+            DEDUPE_STATS[f"{kind}_duplicates"] += 1
+            logger.debug("Dropping %s (%s duplicate of %s)", row["url"], kind, article_id)
+            continue
+        # Negative keys keep batch rows apart from stored article ids
+        batch.add(-1 - position, fp["canonical_url"], fp["simhash"], fp["published_at"])
+        kept.append(row)
+        fingerprints.append(fp)
+    return kept, fingerprints
+
+
+async def save_fingerprints(db: AsyncSession, article_ids: List[int], fingerprints: List[dict]):
+    """Insert the fingerprints of freshly inserted articles; the caller commits"""
+    values = [
+        {**fp, "article_id": article_id, "simhash": _to_signed(fp["simhash"])}
+        for article_id, fp in zip(article_ids, fingerprints)
+    ]
+    if values:
+        await db.execute(insert(ArticleFingerprint), values)
+
+
+def index_fingerprints(article_ids: List[int], fingerprints: List[dict]):
+    """Add committed fingerprints to this process's index"""
+    for article_id, fp in zip(article_ids, fingerprints):
+        fingerprint_index.add(article_id, fp["canonical_url"], fp["simhash"], fp["published_at"])
+
+
+async def backfill_fingerprints(db: AsyncSession, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """Fingerprint stored articles that have none yet, e.g. rows from before this table existed"""
+    total = 0
+    while True:
+        rows = (await db.execute(
+            select(NewsArticle.id, NewsArticle.url, NewsArticle.title,
+                   NewsArticle.description, NewsArticle.published_at)
+            .outerjoin(ArticleFingerprint, ArticleFingerprint.article_id == NewsArticle.id)
+            .where(ArticleFingerprint.id.is_(None))
+            .order_by(NewsArticle.id)
+            .limit(batch_size)
+        )).all()
+        if not rows:
+            break
+        await save_fingerprints(db, [row.id for row in rows], [fingerprint_row(row._asdict()) for row in rows])
+        await db.commit()
+        total += len(rows)
+        if len(rows) < batch_size:
+            break
+    if total:
+        DEDUPE_STATS["backfilled"] += total
+        logger.info("Backfilled fingerprints for %d stored articles", total)
+    return total
@@ -0,0 +1,289 @@
+"""Single-pass extractors for PCWorld listings and RSS entry HTML.
+
+The PCWorld listing markup is described declaratively by ``PCWORLD_ITEM_FIELDS`` and
+``PCWORLD_META_FIELDS``. Each ``article.item`` element is walked once and
+every field takes the first matching descendant, which is what the previous
+BeautifulSoup ``find`` calls returned.
+"""
+from collections import namedtuple
+from html.parser import HTMLParser
+
+from bs4.dammit import EntitySubstitution
+from lxml import etree
+
+from .articles import Article
+from .dates import date_normalizer
+
+PCWORLD_BASE_URL = "https://www.pcworld.com"
+
+# tag: element name; css_class: required class token (or None);
+# attr: attribute to read (None reads the stripped text);
+# require_attr: only match elements that carry ``attr``
+Field = namedtuple("Field", "tag css_class attr require_attr")
+
+# Keyed by Article attribute
+PCWORLD_ITEM_FIELDS = {
+    "title": Field("h3", None, None, False),
+    "url": Field("a", None, "href", True),
+    "image_url": Field("img", None, "src", False),
+    "description": Field("span", "item-excerpt", None, False),
+}
+
+# Looked up inside the first div.item-meta of an item; the date is
+# normalized into published_at
+PCWORLD_META_FIELDS = {
+    "author": Field("span", "item-byline", None, False),
+    "published_at": Field("span", "item-date", None, False),
+}
+
+
+def _class_test(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+_FEED_ITEMS = etree.XPath(
+    f"(//div[{_class_test('articleFeed-inner')}])[1]//article[{_class_test('item')}]"
+)
+# Same strings BeautifulSoup's get_text() keeps: no comments and nothing
+# inside script/style/template/ruby annotations
+_TEXT_NODES = etree.XPath(
+    ".//text()[not(ancestor::script or ancestor::style or ancestor::template"
+    " or ancestor::rt or ancestor::rp)]",
+    smart_strings=False,
+)
+_ITEM_TAGS = tuple({field.tag for field in PCWORLD_ITEM_FIELDS.values()} | {"div"})
+_META_TAGS = tuple({field.tag for field in PCWORLD_META_FIELDS.values()})
+
+
+def pcworld_listing_url(category, page):
+    """URL of a listing page, e.g. category "windows/news" """
+    return f"{PCWORLD_BASE_URL}/{category.strip('/')}/page/{page}"
+
+
+def _has_class(element, name):
+    return name in (element.get("class") or "").split()
+
+
+def _text(element):
+    return "".join(text.strip() for text in _TEXT_NODES(element))
+
+
+def _value(element, field):
+    if element is None:
+        return None
+    return element.get(field.attr) if field.attr else _text(element)
+
+
+def _first_matches(root, fields, tags, want_meta=False):
+    """Walk ``root`` once and return the first element matching each field"""
+    found = {}
+    meta = None
+    remaining = len(fields) + (1 if want_meta else 0)
+    for element in root.iter(*tags):
+        if want_meta and meta is None and element.tag == "div" and _has_class(element, "item-meta"):
+            meta = element
+            remaining -= 1
+        for name, field in fields.items():
+            if name in found or element.tag != field.tag:
+                continue
+            if field.css_class and not _has_class(element, field.css_class):
+                continue
+            if field.require_attr and element.get(field.attr) is None:
+                continue
+            found[name] = element
+            remaining -= 1
+        if not remaining:
+            break
+    return found, meta
+
+
+def extract_pcworld_articles(html, source="PCWorld", now=None):
+    """
+    Parses one PCWorld listing page (str or bytes) and returns its Articles
+    in page order. Relative dates ("3 hours ago") count back from ``now``.
+    """
+    if not html:
+        return []
+    root = etree.HTML(html)
+    if root is None:
+        return []
+
+    items = []
+    for item in _FEED_ITEMS(root):
+        found, meta = _first_matches(item, PCWORLD_ITEM_FIELDS, _ITEM_TAGS, want_meta=True)
+        meta_found = _first_matches(meta, PCWORLD_META_FIELDS, _META_TAGS)[0] if meta is not None else {}
+
+        values = {name: _value(found.get(name), field) for name, field in PCWORLD_ITEM_FIELDS.items()}
+        for name, field in PCWORLD_META_FIELDS.items():
+            values[name] = _value(meta_found.get(name), field)
+        items.append(values)
+
+    # The whole page counts back from one ``now``
+    dates = date_normalizer.normalize_many([values["published_at"] for values in items], source, now)
+    for values, published_at in zip(items, dates):
+        values["published_at"] = published_at
+    return [Article(source=source, **values) for values in items]
+
+
+# ---------- RSS entry HTML ----------
+
+# Text inside these tags is not part of BeautifulSoup's get_text() output
+_HIDDEN_TEXT_TAGS = frozenset(["script", "style", "template", "rt", "rp"])
+# Tags BeautifulSoup closes as soon as they open
+_VOID_TAGS = frozenset([
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link",
+    "menuitem", "meta", "param", "source", "track", "wbr",
+    "basefont", "bgsound", "command", "frame", "image", "isindex", "nextid", "spacer",
+])
+
+
+class _ScanComplete(Exception):
+    pass
+
+
+class _EntryHTMLScanner(HTMLParser):
+    """
+    Streams an HTML fragment once and collects what
+    ``BeautifulSoup(html, 'html.parser')`` would give for
+    ``soup.find('img').get('src')`` and
+    ``soup.get_text(separator=' ', strip=True)[:text_limit]``.
+
+    Text is grouped into strings exactly like BeautifulSoup does (one string
+    per run of data between two markup events), so the joined output is
+    identical. Parsing stops as soon as both results are settled.
+    """
+
+    def __init__(self, want_image, text_limit):
+        super().__init__(convert_charrefs=False)
+        self.image = None
+        self.strings = []
+        self._image_done = not want_image
+        self._text_limit = text_limit
+        self._text_length = -1  # length of ' '.join(self.strings)
+        self._data = []
+        self._open = []
+        self._hidden = 0
+        self._closed_void = []
+
+    # -- results --
+
+    def _done(self):
+        return self._image_done and self._text_length >= self._text_limit
+
+    def _flush(self):
+        if not self._data:
+            return
+        data = "".join(self._data)
+        self._data = []
+        if not self._hidden:
+            self._add_string(data)
+
+    def _add_string(self, data):
+        data = data.strip()
+        if data:
+            self.strings.append(data)
+            self._text_length += len(data) + 1
+            if self._done():
+                raise _ScanComplete
+
+    # -- tag structure, mirroring BeautifulSoup 4.12's html.parser builder --
+
+    def handle_starttag(self, tag, attrs, close_void=True):
+        self._flush()
+        if not self._image_done and tag == "img":
+            src = None
+            for key, value in attrs:
+                if key == "src":
+                    src = value or ""
+            self.image = src or None
+            self._image_done = True
+            if self._done():
+                raise _ScanComplete
+        self._open.append(tag)
+        if tag in _HIDDEN_TEXT_TAGS:
+            self._hidden += 1
+        if close_void and tag in _VOID_TAGS:
+            # Closed right away; a later explicit </tag> is then ignored
+            self._pop_to(tag)
+            self._closed_void.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs, close_void=False)
+        self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self._closed_void:
+            self._closed_void.remove(tag)
+            return
+        self._pop_to(tag)
+
+    def _pop_to(self, tag):
+        self._flush()
+        if tag not in self._open:
+            return
+        while True:
+            name = self._open.pop()
+            if name in _HIDDEN_TEXT_TAGS:
+                self._hidden -= 1
+            if name == tag:
+                break
+
+    # -- character data --
+
+    def handle_data(self, data):
+        self._data.append(data)
+
+    def handle_charref(self, name):
+        if name[0] in "xX":
+            codepoint = int(name.lstrip(name[0]), 16)
+        else:
+            codepoint = int(name)
+        data = None
+        if codepoint < 256:
+            # Same Windows-1252 compensation BeautifulSoup applies
+            try:
+                data = bytes([codepoint]).decode("windows-1252")
+            except UnicodeDecodeError:
+                pass
+        if not data:
+            try:
+                data = chr(codepoint)
+            except (ValueError, OverflowError):
+                pass
+        self.handle_data(data or "\N{REPLACEMENT CHARACTER}")
+
+    def handle_entityref(self, name):
+        character = EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name)
+        self.handle_data(character if character is not None else "&%s" % name)
+
+    # -- markup that ends a string but contributes no text --
+
+    def handle_comment(self, data):
+        self._flush()
+
+    def handle_decl(self, decl):
+        self._flush()
+
+    def handle_pi(self, data):
+        self._flush()
+
+    def unknown_decl(self, data):
+        self._flush()
+        if data.upper().startswith("CDATA["):
+            self._add_string(data[len("CDATA["):])
+
+
+def scan_entry_html(html, want_image=True, text_limit=500):
+    """
+    Single pass over an RSS summary/content fragment. Returns
+    ``(first_img_src, plain_text[:text_limit])``; pass ``want_image=False``
+    or ``text_limit=0`` to skip the part that isn't needed.
+    """
+    scanner = _EntryHTMLScanner(want_image, text_limit)
+    try:
+        scanner.feed(html)
+        scanner.close()
+        scanner._flush()
+    except _ScanComplete:
+        pass
+    return scanner.image, " ".join(scanner.strings)[:text_limit]
@@ -0,0 +1,222 @@
+"""Shared async HTTP fetch layer used by the news scrapers.
+
+All upstream pages and feeds go through one pooled ``httpx.AsyncClient`` per
+event loop, with a per-host concurrency limit, timeouts and retries with
+exponential backoff.
+"""
+import asyncio
+import logging
+import random
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from decouple import config
+
+from .metrics import UPSTREAM_BYTES, UPSTREAM_FETCH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+FETCH_TIMEOUT = config('FETCH_TIMEOUT', default=15.0, cast=float)
+FETCH_CONNECT_TIMEOUT = config('FETCH_CONNECT_TIMEOUT', default=5.0, cast=float)
+FETCH_RETRIES = config('FETCH_RETRIES', default=2, cast=int)
+FETCH_BACKOFF = config('FETCH_BACKOFF', default=0.5, cast=float)
+FETCH_PER_HOST_LIMIT = config('FETCH_PER_HOST_LIMIT', default=4, cast=int)
+FETCH_MAX_CONNECTIONS = config('FETCH_MAX_CONNECTIONS', default=20, cast=int)
+FETCH_USER_AGENT = config(
+    'FETCH_USER_AGENT',
+    default='Mozilla/5.0 (compatible; TechNewsAggregator/1.0)'
+)
+
+# Status codes worth retrying; everything else is returned or raised as-is
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class _LoopState:
+    """Client and per-host semaphores bound to a single event loop"""
+
+    def __init__(self):
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(FETCH_TIMEOUT, connect=FETCH_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=FETCH_MAX_CONNECTIONS,
+                max_keepalive_connections=FETCH_MAX_CONNECTIONS,
+            ),
+            headers={"User-Agent": FETCH_USER_AGENT},
+            follow_redirects=True,
+        )
+        self.host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    def host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        semaphore = self.host_limits.get(host)
+        if semaphore is None:
+            semaphore = self.host_limits[host] = asyncio.Semaphore(FETCH_PER_HOST_LIMIT)
+        return semaphore
+
+
+# httpx clients can't be shared across event loops (the background task path
+# still runs its own loop), so keep one state per running loop.
+_loop_states: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _state() -> _LoopState:
+    loop = asyncio.get_running_loop()
+    state = _loop_states.get(loop)
+    if state is None:
+        state = _loop_states[loop] = _LoopState()
+    return state
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the pooled client for the running event loop"""
+    return _state().client
+
+
+def _backoff_delay(attempt: int, response: Optional[httpx.Response] = None) -> float:
+    if response is not None:
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return min(float(retry_after), 30.0)
+    return FETCH_BACKOFF * (2 ** attempt) + random.uniform(0, FETCH_BACKOFF)
+
+
+async def fetch(url: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+    """
+    GET a URL through the shared client.
+
+    Transport errors and retryable status codes are retried with backoff;
+    the final response is checked with ``raise_for_status`` (a 304 answer
+    to a conditional request is returned as-is).
+    """
+    state = _state()
+    host = urlsplit(url).netloc
+    async with state.host_limit(url):
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                response = await state.client.get(url, headers=headers)
+            except httpx.TransportError as e:
+                if attempt >= FETCH_RETRIES:
+                    raise
+                delay = _backoff_delay(attempt)
+                logger.warning("Fetch of %s failed (%s), retrying in %.2fs", url, e, delay)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= FETCH_RETRIES:
+                    UPSTREAM_FETCH_SECONDS.labels(host).observe(time.perf_counter() - started)
+                    UPSTREAM_BYTES.labels(host).inc(len(response.content))
+                    if response.status_code != 304:
+                        response.raise_for_status()
+                    return response
+                delay = _backoff_delay(attempt, response)
+                logger.warning(
+                    "Fetch of %s returned %d, retrying in %.2fs",
+                    url, response.status_code, delay
+                )
+            attempt += 1
+            await asyncio.sleep(delay)
+
+
+async def aclose():
+    """Close the client bound to the running event loop, if any"""
+    state = _loop_states.pop(asyncio.get_running_loop(), None)
+    if state is not None:
+        await state.client.aclose()
+
+
+# ---------- Conditional requests ----------
+
+@dataclass
+class Validator:
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_length: int = 0
+    parse_seconds: float = 0.0
+
+
+class ValidatorStore:
+    """
+    Per-URL ETag/Last-Modified validators for one ingestion run.
+
+    Loaded from and saved to the FeedValidator table by the scheduler;
+    ``changed`` tracks which URLs need to be written back.
+    """
+
+    def __init__(self, validators: Optional[Dict[str, Validator]] = None):
+        self.validators: Dict[str, Validator] = validators or {}
+        self.sources: Dict[str, str] = {}
+        self.changed = set()
+
+    def request_headers(self, url: str) -> Dict[str, str]:
+        validator = self.validators.get(url)
+        headers = {}
+        if validator is not None:
+            if validator.etag:
+                headers["If-None-Match"] = validator.etag
+            if validator.last_modified:
+                headers["If-Modified-Since"] = validator.last_modified
+        return headers
+
+    def update(self, url: str, source: str, response: httpx.Response):
+        self.validators[url] = Validator(
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            content_length=len(response.content),
+        )
+        self.sources[url] = source
+        self.changed.add(url)
+
+    def discard(self, source: str):
+        """Forget this run's unsaved validators for ``source``, e.g. after it failed"""
+        self.changed -= {url for url in self.changed if self.sources.get(url) == source}
+
+    def record_parse(self, url: str, seconds: float):
+        validator = self.validators.get(url)
+        if validator is not None:
+            validator.parse_seconds = seconds
+
+
+# Per-source savings from 304 responses, reported on the stats endpoint
+CONDITIONAL_GET_STATS: Dict[str, Dict[str, float]] = {}
+
+
+def _conditional_stats(source: str) -> Dict[str, float]:
+    stats = CONDITIONAL_GET_STATS.get(source)
+    if stats is None:
+        stats = CONDITIONAL_GET_STATS[source] = {
+            "requests": 0,
+            "not_modified": 0,
+            "bytes_downloaded": 0,
+            "bytes_saved": 0,
+            "parse_seconds_saved": 0.0,
+        }
+    return stats
+
+
+async def fetch_conditional(url: str, source: str, validators: ValidatorStore) -> Optional[httpx.Response]:
+    """
+    GET ``url`` with If-None-Match/If-Modified-Since from ``validators``.
+
+    Returns None on 304 Not Modified, otherwise the full response, whose
+    validators are stored for the next run.
+    """
+    stats = _conditional_stats(source)
+    stats["requests"] += 1
+
+    response = await fetch(url, headers=validators.request_headers(url))
+    if response.status_code == 304:
+        validator = validators.validators.get(url, Validator())
+        stats["not_modified"] += 1
+        stats["bytes_saved"] += validator.content_length
+        stats["parse_seconds_saved"] += validator.parse_seconds
+        return None
+
+    stats["bytes_downloaded"] += len(response.content)
+    validators.update(url, source, response)
+    return response
@@ -1,131 +1,192 @@
-import os
-import re
-import tempfile
+import asyncio
+import logging
+import threading
+import time
 from fastapi import  File, UploadFile, HTTPException
 from decouple import config
 from b2sdk.v2 import B2Api, InMemoryAccountInfo
-from bs4 import BeautifulSoup
-from bs4.element import Tag
+from b2sdk.v2.exception import InvalidAuthToken
 import feedparser
-import requests
-from datetime import datetime, timedelta, timezone
-from dateutil.relativedelta import relativedelta
-from dateutil.parser import parse
+from datetime import datetime, timezone
+from .articles import Article
+from .dates import date_normalizer
+from .extractors import extract_pcworld_articles, pcworld_listing_url, scan_entry_html
+from .fetcher import fetch, fetch_conditional
+from .metrics import PARSE_SECONDS
+from .parse_pool import run_parse
 
+logger = logging.getLogger(__name__)
 
 SECRET_KEY = config('SECRET_KEY')
 BUCKET_NAME = config('AWS_STORAGE_BUCKET_NAME')
 AWS_ACCESS_KEY_ID = config('AWS_ACCESS_KEY_ID')
 AWS_SECRET_ACCESS_KEY = config('AWS_SECRET_ACCESS_KEY')
 AWS_S3_REGION_NAME = config('AWS_S3_REGION_NAME')
-def convert_relative_time_to_date(relative_time):
-    """Convert relative time strings to UTC datetime objects"""
-    try:
-        # Try parsing absolute dates first
-        parsed_date = parse(relative_time)
-        if parsed_date.tzinfo is None:
-            parsed_date = parsed_date.replace(tzinfo=timezone.utc)
-        else:
-            parsed_date = parsed_date.astimezone(timezone.utc)
-        return parsed_date
-    except (ValueError, OverflowError):
-        pass  # Continue to relative time parsing
-    
-    # Handle relative time patterns
-    match = re.match(
-        r'(\d+)\s+(second|minute|hour|day|week|month|year)s?\s+ago', 
-        relative_time.lower().strip()
-    )
-    if not match:
-        return None
+# Part size for multipart (large-file) uploads; B2's minimum is 5 MB.
+# Images smaller than one part are sent as a single upload.
+B2_UPLOAD_PART_SIZE = config('B2_UPLOAD_PART_SIZE', default=8 * 1024 * 1024, cast=int)
 
-    value = int(match.group(1))
-    unit = match.group(2)
-
-    unit_conversion = {
-        'second': 'seconds',
-        'minute': 'minutes',
-        'hour': 'hours',
-        'day': 'days',
-        'week': 'weeks',
-        'month': 'months',
-        'year': 'years'
-    }
+_b2_lock = threading.Lock()
+_b2_api = None
+_b2_buckets = {}
 
-    try:
-        now = datetime.now(timezone.utc)
-        kwargs = {unit_conversion[unit]: value}
-        return now - relativedelta(**kwargs)
-    except KeyError:
-        return None
 
-def upload_image_to_backblaze(file: UploadFile, bucket_name: str = BUCKET_NAME):
+def get_b2_bucket(bucket_name: str = BUCKET_NAME):
+    """
+    Return the shared authorized B2Api and a cached bucket handle.
+
+    The account is authorized once per process; b2sdk renews expired
+    tokens itself using the stored application key.
+    """
+    global _b2_api
+    with _b2_lock:
+        if _b2_api is None:
+            b2_api = B2Api(InMemoryAccountInfo())
+            b2_api.authorize_account("production", AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY)
+            _b2_api = b2_api
+        bucket = _b2_buckets.get(bucket_name)
+        if bucket is None:
+            bucket = _b2_buckets[bucket_name] = _b2_api.get_bucket_by_name(bucket_name)
+        return _b2_api, bucket
+
+
+def reset_b2_client():
+    """Drop the cached client so the next upload authorizes again"""
+    global _b2_api
+    with _b2_lock:
+        _b2_api = None
+        _b2_buckets.clear()
+
+
+def upload_image_to_backblaze(file: UploadFile, bucket_name: str = BUCKET_NAME, file_name: str = None):
+    """Upload ``file`` as ``file_name`` (its own filename by default) and return its download URL"""
     # Validate the file
-    if not file.content_type.startswith('image/'):
+    if not file.content_type or not file.content_type.startswith('image/'):
         raise HTTPException(status_code=400, detail="Only image files are allowed.")
-    
-    # Delete existing image if applicable
-    
-    
-    # Create a temporary file
-    with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-        content = file.file.read()
-        temp_file.write(content)
-        temp_file_path = temp_file.name
-    
-    # Authorize Backblaze account
-    application_key_id = AWS_ACCESS_KEY_ID
-    application_key = AWS_SECRET_ACCESS_KEY
-    info = InMemoryAccountInfo()
-    b2_api = B2Api(info)
-    b2_api.authorize_account("production", application_key_id, application_key)
-    
-    # Upload the image to Backblaze
-    bucket = b2_api.get_bucket_by_name(bucket_name)
-    uploaded_file = bucket.upload_local_file(local_file=temp_file_path, file_name=file.filename)
-    
+
+    for attempt in range(2):
+        b2_api, bucket = get_b2_bucket(bucket_name)
+        # Stream straight from the upload's spooled file; big images go up
+        # as a multipart large file with bounded part buffers
+        file.file.seek(0)
+        try:
+            uploaded_file = bucket.upload_unbound_stream(
+                file.file,
+                file_name or file.filename,
+                content_type=file.content_type,
+                recommended_upload_part_size=B2_UPLOAD_PART_SIZE,
+                buffer_size=B2_UPLOAD_PART_SIZE,
+            )
+            break
+        except InvalidAuthToken:
+            if attempt:
+                raise
+            logger.warning("B2 auth token rejected, re-authorizing")
+            reset_b2_client()
+
     # Retrieve the uploaded file URL
-    image_url = b2_api.get_download_url_for_fileid(uploaded_file.id_)
-    
-    # Clean up the temporary file
-    os.remove(temp_file_path)
-    
-    return image_url
+    return b2_api.get_download_url_for_fileid(uploaded_file.id_)
+
+
+async def upload_image_to_backblaze_async(file: UploadFile, bucket_name: str = BUCKET_NAME, file_name: str = None):
+    """Run the blocking B2 upload off the event loop"""
+    return await asyncio.to_thread(upload_image_to_backblaze, file, bucket_name, file_name)
 
 
-def scrape_pcworld():
-    base_url = "https://www.pcworld.com/news/page/{}"
+PCWORLD_NEWS_CATEGORY = "news"
+PCWORLD_PAGES = 8
+
+
+async def _fetch_source_url(url, source_name, validators=None):
+    """
+    Fetch through the conditional path when validators are given.
+    Returns None when the upstream answered 304 Not Modified.
+    """
+    if validators is None:
+        return await fetch(url)
+    return await fetch_conditional(url, source_name, validators)
+
+
+async def _timed_parse(source_name, validators, url, parse, *args):
+    """Run a parse function in the parse pool, recording its duration"""
+    started = time.perf_counter()
+    result = await run_parse(parse, *args)
+    seconds = time.perf_counter() - started
+    PARSE_SECONDS.labels(source_name).observe(seconds)
+    if validators is not None:
+        validators.record_parse(url, seconds)
+    return result
+
+
+async def scrape_pcworld_category_async(category, pages):
+    """
+    Fetches the first ``pages`` listing pages of a PCWorld category
+    (e.g. "windows/news") concurrently and returns their articles in order.
+    """
+    responses = await asyncio.gather(*(
+        fetch(pcworld_listing_url(category, page)) for page in range(1, pages + 1)
+    ))
+    pages = await asyncio.gather(*(
+        run_parse(extract_pcworld_articles, response.text) for response in responses
+    ))
+    return [article for articles in pages for article in articles]
+
+
+async def scrape_pcworld_async(validators=None, checkpoints=None):
+    """
+    Scrapes the PCWorld news listing: all pages are fetched
+    concurrently and parsed in page order. With ``validators`` the pages
+    are requested conditionally and unchanged pages are skipped.
+
+    With ``checkpoints`` only articles newer than the PCWorld mark are
+    returned, and once a mark exists pages are walked one at a time,
+    stopping at the first page that has nothing new.
+    """
+    urls = [pcworld_listing_url(PCWORLD_NEWS_CATEGORY, page) for page in range(1, PCWORLD_PAGES + 1)]
+    checkpoint = checkpoints.get("PCWorld") if checkpoints is not None else None
+    if checkpoint is not None and not checkpoint.is_empty:
+        return await _scrape_pcworld_incremental(urls, validators, checkpoint)
+
+    responses = await asyncio.gather(*(
+        _fetch_source_url(url, "PCWorld", validators) for url in urls
+    ))
+
+    fetched = [(url, response) for url, response in zip(urls, responses) if response is not None]
+    pages = await asyncio.gather(*(
+        _timed_parse("PCWorld", validators, url, extract_pcworld_articles, response.text)
+        for url, response in fetched
+    ))
+
+    all_articles = []
+    for articles in pages:
+        if checkpoint is not None:
+            for article in articles:
+                checkpoint.observe(article.url)
+        all_articles.extend(articles)
+    return all_articles
+
+
+async def _scrape_pcworld_incremental(urls, validators, checkpoint):
     all_articles = []
+    for url in urls:
+        response = await _fetch_source_url(url, "PCWorld", validators)
+        if response is None:
+            # Unchanged page: nothing new here or on any later page
+            break
 
-    for page in range(1, 9):
-        url = base_url.format(page)
-        response = requests.get(url)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'lxml')
-
-        articles_section = soup.find("div", class_="articleFeed-inner")
-        if not articles_section:
-            continue
-
-        for article in articles_section.find_all("article", class_="item"):
-            title = article.find("h3").get_text(strip=True) if article.find("h3") else None
-            link = article.find("a", href=True)["href"] if article.find("a", href=True) else None
-            image = article.find("img")["src"] if article.find("img") else None
-            excerpt = article.find("span", class_="item-excerpt").get_text(strip=True) if article.find("span", class_="item-excerpt") else None
-
-            meta = article.find("div", class_="item-meta")
-            author = meta.find("span", class_="item-byline").get_text(strip=True) if meta and meta.find("span", class_="item-byline") else None
-            date = meta.find("span", class_="item-date").get_text(strip=True) if meta and meta.find("span", class_="item-date") else None
-
-            all_articles.append({
-                "source": "PCWorld",
-                "title": title,
-                "link": link,
-                "image": image,
-                "excerpt": excerpt,
-                "author": author,
-                "date": date,
-            })
+        articles = await _timed_parse("PCWorld", validators, url, extract_pcworld_articles, response.text)
+        reached_known = False
+        for article in articles:
+            if not article.url:
+                continue
+            if checkpoint.is_known(article.url):
+                reached_known = True
+                continue
+            checkpoint.observe(article.url)
+            all_articles.append(article)
+        if reached_known:
+            # Reached already-ingested articles; later pages are older still
+            break
     return all_articles
 
 
@@ -137,11 +198,11 @@ RSS_FEEDS = {
 }
 
 
-def extract_image(entry):
-    """
-    Extracts image URL from an RSS entry using common methods:
-    media_content, enclosures, or first <img> tag in summary or content.
-    """
+EXCERPT_LIMIT = 500
+
+
+def _linked_image(entry):
+    """First URL from media_content or enclosures, without touching HTML"""
     # Check for media content
     media = entry.get('media_content')
     if isinstance(media, list):
@@ -158,61 +219,121 @@ def extract_image(entry):
             if url:
                 return url
 
-    # Fallback: find image in HTML summary
-    summary = entry.get('summary', '')
-    if summary:
-        soup = BeautifulSoup(summary, 'html.parser')
-        img_tag = soup.find('img')
-        if isinstance(img_tag, Tag):
-            src = img_tag.get('src')
-            if src:
-                return src
-
-    # Additional fallback: check 'content' field if available
+    return None
+
+def _content_image(entry):
+    """First <img> src in the entry's 'content' values"""
     content = entry.get('content')
     if isinstance(content, list):
         for item in content:
             value = item.get('value', '')
             if value:
-                soup = BeautifulSoup(value, 'html.parser')
-                img_tag = soup.find('img')
-                if isinstance(img_tag, Tag):
-                    src = img_tag.get('src')
-                    if src:
-                        return src
-
+                src, _ = scan_entry_html(value, want_image=True, text_limit=0)
+                if src:
+                    return src
     return None
 
-def clean_excerpt(html, limit=500):
+def extract_entry_media(entry, limit=EXCERPT_LIMIT):
     """
-    Converts HTML summary to plain text and trims it to a set length.
+    Returns ``(image, excerpt)`` for an RSS entry with a single pass over
+    its summary. The image comes from media_content, enclosures, the first
+    <img> in the summary or the content field, in that order; the excerpt
+    is the summary as plain text, trimmed to ``limit``.
     """
-    soup = BeautifulSoup(html, 'html.parser')
-    text = soup.get_text(separator=' ', strip=True)
-    return text[:limit]
+    image = _linked_image(entry)
+    summary = entry.get('summary', '')
+    src, excerpt = scan_entry_html(summary, want_image=image is None, text_limit=limit)
+    if image is None:
+        image = src or _content_image(entry)
+    return image, excerpt
+
+def _entry_published(entry):
+    """Naive UTC datetime from feedparser's published_parsed, if any"""
+    parsed = entry.get("published_parsed") or entry.get("updated_parsed")
+    if not parsed:
+        return None
+    return datetime(*parsed[:6])
 
-def fetch_rss_articles():
+def parse_rss_feed(source_name, feed, checkpoint=None):
     """
-    Parses all RSS feeds and returns a list of article dicts.
+    Converts a parsed feedparser feed into a list of Articles.
+    With a ``checkpoint``, entries at or behind the mark are skipped
+    before their HTML is processed.
     """
     articles = []
 
-    for source_name, feed_url in RSS_FEEDS.items():
-        feed = feedparser.parse(feed_url)
-        # print("Feeds",feed)
-
-        for entry in feed.entries:
-            article = {
-                "source": source_name,
-                "title": entry.get("title", "No Title"),
-                "link": entry.get("link"),
-                "image": extract_image(entry),
-                "excerpt": clean_excerpt(entry.get("summary", "")),
-                "author": entry.get("author", None),
-                "date": entry.get("published", "")
-            }
-            articles.append(article)
-            # print("Article", article)
-    # print("Total articles fetched:", len(articles))
-
-    return articles
\ No newline at end of file
+    for entry in feed.entries:
+        published = _entry_published(entry)
+        if checkpoint is not None:
+            ident = entry.get("id") or entry.get("link")
+            if checkpoint.is_known(ident, published):
+                continue
+            checkpoint.observe(ident, published)
+
+        image, excerpt = extract_entry_media(entry)
+        articles.append(Article(
+            source=source_name,
+            title=entry.get("title", "No Title"),
+            url=entry.get("link"),
+            image_url=image,
+            description=excerpt,
+            author=entry.get("author", None),
+            # feedparser has already parsed the date; its string is the fallback
+            published_at=(
+                published.replace(tzinfo=timezone.utc) if published
+                else date_normalizer.normalize(entry.get("published"), source_name)
+            ),
+        ))
+
+    return articles
+
+async def fetch_rss_feed_async(source_name, feed_url, validators=None, checkpoints=None, raise_errors=False):
+    """
+    Downloads and parses a single RSS feed. Like feedparser.parse(url),
+    a failing feed yields no articles instead of raising, unless
+    ``raise_errors`` is set. With ``validators`` an unchanged feed (304)
+    yields no articles either, and with ``checkpoints`` only entries newer
+    than the source's mark are kept.
+    """
+    try:
+        response = await _fetch_source_url(feed_url, source_name, validators)
+    except Exception as e:
+        if raise_errors:
+            raise
+        logger.warning("Failed to fetch %s feed %s: %s", source_name, feed_url, e)
+        return []
+    if response is None:
+        return []
+
+    checkpoint = checkpoints.get(source_name) if checkpoints is not None else None
+    headers = {
+        "content-type": response.headers.get("content-type", ""),
+        "content-location": str(response.url),
+    }
+    articles, parsed_checkpoint = await _timed_parse(
+        source_name, validators, feed_url, parse_feed_document, source_name, response.content, headers, checkpoint
+    )
+    if checkpoint is not None and parsed_checkpoint is not checkpoint:
+        # Parsed in a worker process: bring its observations back
+        checkpoint.absorb(parsed_checkpoint)
+    return articles
+
+def parse_feed_document(source_name, content, response_headers, checkpoint=None):
+    """
+    Parse-stage entry point for a downloaded feed: raw bytes in, article
+    Articles out, plus the checkpoint carrying this run's observations.
+    """
+    feed = feedparser.parse(content, response_headers=response_headers)
+    return parse_rss_feed(source_name, feed, checkpoint), checkpoint
+
+async def fetch_rss_articles_async(validators=None, checkpoints=None):
+    """
+    Fetches every feed in RSS_FEEDS concurrently and returns their Articles
+    in RSS_FEEDS order. Scheduled ingestion fetches each feed on its own
+    with fetch_rss_feed_async so that sources are stored independently.
+    """
+    results = await asyncio.gather(*(
+        fetch_rss_feed_async(source_name, feed_url, validators, checkpoints)
+        for source_name, feed_url in RSS_FEEDS.items()
+    ))
+    return [article for articles in results for article in articles]
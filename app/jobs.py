@@ -0,0 +1,314 @@
+"""In-process job runner for ingestion runs.
+
+A submitted job gets an id that can be polled for status, progress and
+result. Submitting while a job with the same key is queued or running
+returns that job instead of starting another one. At most
+``JOB_MAX_CONCURRENCY`` jobs run at once, and finished jobs are kept in a
+bounded history.
+
+Code running inside a job reports progress with ``set_stage`` and
+``report_progress``. Outside a job these calls do nothing.
+
+Jobs run in the worker that accepted them. Each job's state is also saved
+to the ``JobRecord`` table when it starts and finishes, and every
+``JOB_SAVE_INTERVAL`` seconds while it runs, so any worker can report on
+any job. A trigger is also coalesced into a job already active in another
+worker. An active record whose owner has stopped saving for
+``JOB_STALE_SECONDS`` is reported as ``lost``.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from decouple import config
+from sqlalchemy import delete, insert, or_, select, update
+
+from .database.database import async_engine
+from .models import JobRecord
+
+logger = logging.getLogger(__name__)
+
+JOB_MAX_CONCURRENCY = config('JOB_MAX_CONCURRENCY', default=1, cast=int)
+JOB_HISTORY_LIMIT = config('JOB_HISTORY_LIMIT', default=50, cast=int)
+JOB_PERSIST = config('JOB_PERSIST', default=True, cast=bool)
+JOB_SAVE_INTERVAL = config('JOB_SAVE_INTERVAL', default=2.0, cast=float)
+JOB_STALE_SECONDS = config('JOB_STALE_SECONDS', default=60.0, cast=float)
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class JobSkipped(Exception):
+    """Raised by a job body that decided not to run, e.g. lock held elsewhere"""
+
+
+@dataclass
+class Job:
+    id: str
+    key: str
+    trigger: str
+    status: str = "queued"  # queued, running, succeeded, failed, skipped
+    stage: Optional[str] = None
+    # source -> progress fields reported by the job body
+    progress: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    result: Any = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    coalesced: int = 0
+    _done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    _exception: Optional[BaseException] = field(default=None, repr=False)
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE_STATUSES
+
+    async def wait(self) -> Any:
+        """Wait for the job and return its result, re-raising its error"""
+        await self._done.wait()
+        if self._exception is not None:
+            raise self._exception
+        return self.result
+
+    def as_dict(self) -> dict:
+        def iso(ts):
+            return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(ts)) if ts else None
+
+        end = self.finished_at or time.time()
+        return {
+            "id": self.id,
+            "key": self.key,
+            "trigger": self.trigger,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "coalesced": self.coalesced,
+            "created_at": iso(self.created_at),
+            "started_at": iso(self.started_at),
+            "finished_at": iso(self.finished_at),
+            "queued_seconds": round((self.started_at or end) - self.created_at, 3),
+            "run_seconds": round(end - self.started_at, 3) if self.started_at else None,
+        }
+
+
+_current_job: contextvars.ContextVar[Optional[Job]] = contextvars.ContextVar("current_job", default=None)
+
+
+def set_stage(stage: str):
+    job = _current_job.get()
+    if job is not None:
+        job.stage = stage
+
+
+def report_progress(source: str, **fields):
+    """Merge ``fields`` into the current job's progress for ``source``"""
+    job = _current_job.get()
+    if job is not None:
+        job.progress.setdefault(source, {}).update(fields)
+
+
+class JobStore:
+    """
+    Job snapshots in the database, shared by every worker. Like the
+    in-memory history, the table keeps the newest ``history_limit`` jobs.
+    """
+
+    def __init__(self, history_limit: int = JOB_HISTORY_LIMIT):
+        self.history_limit = history_limit
+
+    async def save(self, job: Job):
+        now = datetime.utcnow()
+        values = {"status": job.status, "updated_at": now, "data": json.dumps(job.as_dict(), default=str)}
+        async with async_engine.begin() as conn:
+            updated = await conn.execute(update(JobRecord).where(JobRecord.id == job.id).values(**values))
+            if not updated.rowcount:
+                await conn.execute(insert(JobRecord).values(
+                    id=job.id, key=job.key, created_at=datetime.utcfromtimestamp(job.created_at), **values
+                ))
+            if not job.active:
+                await self._prune(conn)
+
+    async def _prune(self, conn):
+        """Delete finished (or lost) jobs older than the newest ``history_limit``"""
+        cutoff = (await conn.execute(
+            select(JobRecord.created_at)
+            .order_by(JobRecord.created_at.desc())
+            .offset(self.history_limit - 1)
+            .limit(1)
+        )).scalar()
+        if cutoff is None:
+            return
+        stale = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+        await conn.execute(delete(JobRecord).where(
+            JobRecord.created_at < cutoff,
+            or_(JobRecord.status.notin_(ACTIVE_STATUSES), JobRecord.updated_at < stale),
+        ))
+
+    @staticmethod
+    def _snapshot(record) -> dict:
+        data = json.loads(record.data)
+        stale = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+        if record.status in ACTIVE_STATUSES and record.updated_at < stale:
+            data["status"] = "lost"
+        return data
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        async with async_engine.connect() as conn:
+            record = (await conn.execute(select(JobRecord).where(JobRecord.id == job_id))).first()
+        return self._snapshot(record) if record else None
+
+    async def recent(self, limit: int) -> list:
+        async with async_engine.connect() as conn:
+            records = (await conn.execute(
+                select(JobRecord).order_by(JobRecord.created_at.desc()).limit(limit)
+            )).all()
+        return [self._snapshot(record) for record in records]
+
+    async def active(self, key: str) -> Optional[dict]:
+        """The freshest queued or running job for ``key``, in any worker"""
+        stale = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+        async with async_engine.connect() as conn:
+            record = (await conn.execute(
+                select(JobRecord)
+                .where(JobRecord.key == key, JobRecord.status.in_(ACTIVE_STATUSES), JobRecord.updated_at >= stale)
+                .order_by(JobRecord.created_at.desc())
+                .limit(1)
+            )).first()
+        return self._snapshot(record) if record else None
+
+
+class JobRunner:
+    def __init__(self, max_concurrency: int = JOB_MAX_CONCURRENCY, history_limit: int = JOB_HISTORY_LIMIT,
+                 store: Optional[JobStore] = None):
+        self.max_concurrency = max_concurrency
+        self.history_limit = history_limit
+        self.store = store
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active: Dict[str, Job] = {}
+        self._tasks = set()
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def submit(self, key: str, func: Callable[..., Awaitable[Any]], *args,
+               trigger: str = "manual", **kwargs) -> Job:
+        """
+        Start ``func(*args, **kwargs)`` as a job, or return the queued or
+        running job with the same ``key``.
+        """
+        job = self._active.get(key)
+        if job is not None:
+            job.coalesced += 1
+            logger.info("Coalesced %s trigger into job %s", trigger, job.id)
+            return job
+
+        job = Job(id=uuid.uuid4().hex, key=key, trigger=trigger)
+        self._active[key] = job
+        self._remember(job)
+        task = asyncio.create_task(self._run(job, func, args, kwargs))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def recent(self, limit: int = 20) -> list:
+        return [job.as_dict() for job in reversed(list(self._jobs.values())[-limit:])]
+
+    async def lookup(self, job_id: str) -> Optional[dict]:
+        """State of a job run by this or any other worker"""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.as_dict()
+        if self.store is None:
+            return None
+        return await self._stored(self.store.get(job_id))
+
+    async def history(self, limit: int = 20) -> list:
+        """Recent jobs of every worker, newest first"""
+        if self.store is not None:
+            stored = await self._stored(self.store.recent(limit))
+            if stored is not None:
+                return stored
+        return self.recent(limit)
+
+    async def active_elsewhere(self, key: str) -> Optional[dict]:
+        """A queued or running job for ``key`` in another worker"""
+        if self.store is None or key in self._active:
+            return None
+        job = await self._stored(self.store.active(key))
+        return job if job and job["id"] not in self._jobs else None
+
+    async def _stored(self, query):
+        try:
+            return await query
+        except Exception as e:
+            logger.warning("Job store unavailable: %s", e)
+            return None
+
+    async def _save(self, job: Job):
+        if self.store is None:
+            return
+        try:
+            await self.store.save(job)
+        except Exception as e:
+            logger.warning("Could not save job %s: %s", job.id, e)
+
+    async def _heartbeat(self, job: Job):
+        while True:
+            await asyncio.sleep(JOB_SAVE_INTERVAL)
+            await self._save(job)
+
+    def _remember(self, job: Job):
+        self._jobs[job.id] = job
+        # Drop the oldest finished jobs beyond the history limit
+        excess = len(self._jobs) - self.history_limit
+        for old_id in list(self._jobs):
+            if excess <= 0:
+                break
+            if not self._jobs[old_id].active:
+                del self._jobs[old_id]
+                excess -= 1
+
+    async def _run(self, job: Job, func, args, kwargs):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        _current_job.set(job)
+        await self._save(job)
+        heartbeat = None
+        try:
+            async with self._slots:
+                job.status = "running"
+                job.started_at = time.time()
+                await self._save(job)
+                if self.store is not None:
+                    heartbeat = asyncio.create_task(self._heartbeat(job))
+                job.result = await func(*args, **kwargs)
+                job.status = "succeeded"
+        except JobSkipped as e:
+            job.status = "skipped"
+            job.error = str(e)
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            job._exception = e
+            logger.error("Job %s (%s) failed: %s", job.id, job.key, e, exc_info=True)
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+            job.finished_at = time.time()
+            job.stage = None
+            if self._active.get(job.key) is job:
+                del self._active[job.key]
+            await self._save(job)
+            job._done.set()
+
+
+job_runner = JobRunner(store=JobStore() if JOB_PERSIST else None)
@@ -0,0 +1,176 @@
+"""Cross-process locks so a scheduled job runs in one worker at a time.
+
+Every uvicorn worker (and every serverless instance) starts its own
+scheduler, so each run first tries to take a named, non-blocking lock:
+
+* on Postgres, a session-level ``pg_try_advisory_lock``, which covers every
+  process that talks to the database;
+* elsewhere, an exclusive lock on ``JOB_LOCK_DIR/<name>.lock``, which covers
+  the workers of a single machine.
+
+``JOB_LOCK_BACKEND`` forces ``postgres``, ``file`` or ``none``; the default
+``auto`` picks by database dialect.
+
+An advisory lock lives only as long as its connection, so a long-held lock
+should be checked with ``JobLock.alive()``: after a dropped connection or a
+database failover another process may already hold it.
+
+The lock only stops runs from overlapping. A holder records each completed
+run with ``record_run``, so that the next worker's scheduler, firing a few
+minutes later in the same interval, can see the run with
+``last_run_started`` and skip it.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from decouple import config
+from sqlalchemy import insert, select, text, update
+
+from .database.database import async_engine
+from .models import JobRun
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+JOB_LOCK_BACKEND = config('JOB_LOCK_BACKEND', default='auto')
+JOB_LOCK_DIR = config('JOB_LOCK_DIR', default=tempfile.gettempdir())
+
+
+class JobLock:
+    """Outcome of ``job_lock``; true when this process holds the lock"""
+
+    def __init__(self, acquired: bool, conn=None):
+        self.acquired = acquired
+        self._conn = conn
+
+    def __bool__(self) -> bool:
+        return self.acquired
+
+    async def alive(self) -> bool:
+        """Whether the lock is still held, as far as this process can tell"""
+        if not self.acquired:
+            return False
+        if self._conn is None:
+            return True  # file locks go with the process
+        try:
+            await self._conn.execute(text("SELECT 1"))
+            return True
+        except Exception:
+            logger.warning("Lost the connection holding an advisory lock", exc_info=True)
+            return False
+
+
+def advisory_lock_key(name: str) -> int:
+    """Stable signed 64-bit key for ``name``"""
+    digest = hashlib.sha256(name.encode()).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+@asynccontextmanager
+async def _advisory_lock(name: str) -> AsyncIterator[JobLock]:
+    key = advisory_lock_key(name)
+    # The lock belongs to this connection, so it is held for the whole job.
+    # Autocommit keeps the connection from sitting idle in a transaction
+    # (and tripping idle_in_transaction_session_timeout) while it does.
+    async with async_engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        acquired = bool((await conn.execute(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": key}
+        )).scalar())
+        try:
+            yield JobLock(acquired, conn)
+        finally:
+            if acquired:
+                await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+
+
+def _try_lock_file(handle) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock_file(handle):
+    if fcntl is not None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+    else:
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@asynccontextmanager
+async def _file_lock(name: str) -> AsyncIterator[JobLock]:
+    path = os.path.join(JOB_LOCK_DIR, f"{name}.lock")
+    with open(path, "a+") as handle:
+        acquired = _try_lock_file(handle)
+        try:
+            yield JobLock(acquired)
+        finally:
+            if acquired:
+                _unlock_file(handle)
+
+
+@asynccontextmanager
+async def _no_lock(name: str) -> AsyncIterator[JobLock]:
+    yield JobLock(True)
+
+
+def _backend() -> str:
+    if JOB_LOCK_BACKEND != 'auto':
+        return JOB_LOCK_BACKEND
+    return 'postgres' if async_engine.dialect.name == 'postgresql' else 'file'
+
+
+@asynccontextmanager
+async def job_lock(name: str) -> AsyncIterator[JobLock]:
+    """
+    Try to take the lock for job ``name`` without waiting.
+
+    Yields a ``JobLock`` that is true when this process holds the lock for
+    the duration of the block, false when another process is already
+    running the job.
+    """
+    backend = _backend()
+    if backend == 'postgres':
+        lock = _advisory_lock(name)
+    elif backend == 'file':
+        lock = _file_lock(name)
+    else:
+        lock = _no_lock(name)
+
+    async with lock as held:
+        if not held:
+            logger.info("Job %s is already running elsewhere (%s lock)", name, backend)
+        yield held
+
+
+async def last_run_started(name: str) -> Optional[datetime]:
+    """Start (naive UTC) of the last completed run of job ``name``, if any"""
+    async with async_engine.connect() as conn:
+        return (await conn.execute(
+            select(JobRun.started_at).where(JobRun.name == name)
+        )).scalar()
+
+
+async def record_run(name: str, started_at: datetime):
+    """Record a completed run of job ``name``; call it while holding the lock"""
+    values = {"started_at": started_at, "completed_at": datetime.utcnow()}
+    async with async_engine.begin() as conn:
+        updated = await conn.execute(update(JobRun).where(JobRun.name == name).values(**values))
+        if not updated.rowcount:
+            await conn.execute(insert(JobRun).values(name=name, **values))
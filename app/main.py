@@ -1,19 +1,34 @@
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Header,Request
-import requests
+import asyncio
+import logging
+from functools import partial
+from typing import List, Optional
+from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Header,Request, Query
+from sqlalchemy.orm import Session
 from decouple import config
-from .helper import upload_image_to_backblaze, scrape_pcworld, fetch_rss_articles
-from bs4 import BeautifulSoup
-import feedparser
-from fastapi.responses import JSONResponse
+from .cache import news_cache
+from .helper import scrape_pcworld_async, scrape_pcworld_category_async, fetch_rss_feed_async, RSS_FEEDS
+import orjson
+from fastapi.responses import ORJSONResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
-from .routers.news_scheduler import router as news_router, lifespan
+from .routers.news_scheduler import router as news_router, lifespan, serialize_article
+from .database.database import get_db
+from .search import search_articles, SEARCH_PAGE_SIZE
+from .page_cache import news_page_cache, page_response
+from .metrics import instrument_app, render_metrics
+from .uploads import image_store, UPLOAD_MAX_BATCH
+from .thumbnails import (
+    THUMB_CACHE_CONTROL, THUMB_FORMATS, THUMB_WIDTHS,
+    decode_thumbnail_request, preferred_format, thumbnail_cache, thumbnail_url,
+)
 
 SECRET_KEY = config('SECRET_KEY')
 
-app = FastAPI(lifespan=lifespan)
+logger = logging.getLogger(__name__)
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 # from .routers.news_scheduler import setup_scheduler
 # setup_scheduler(app)
 
@@ -25,6 +40,7 @@ app.add_middleware(
     allow_methods=["*"],  # Allow all HTTP methods (GET, POST, etc.)
     allow_headers=["*"],  # Allow all headers
 )
+instrument_app(app)
 
 
 
@@ -37,146 +53,147 @@ def validate_secret_key(x_secret_key: str = Header(None)):
 def read_root():
     return {"Hello": "World"}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
 
 
-app.include_router(news_router, prefix="/news-workflows", tags=["News Automation"])
+
+app.include_router(news_router)
 
 
 @app.get("/scrape-newsarticles/")
 async def scrape_articles():
-    # Base URL of the page to scrape
-    base_url = "https://www.pcworld.com/accessories/news/page/{}"
-
-    # Initialize a list to store all articles across pages
-    all_articles = []
-
-    # Loop through the first three pages
-    for page in range(1, 4):  # Pages 1 to 3
-        # Format the URL for each page
-        url = base_url.format(page)
-
-        # Make a request to the website
-        response = requests.get(url)
-        response.raise_for_status()  # ensure we got a successful response
-
-        # Parse the HTML content
-        soup = BeautifulSoup(response.text, 'lxml')
-
-        # Find the section containing the articles
-        articles_section = soup.find("div", class_="articleFeed-inner")
-
-        # Ensure the section was found
-        if articles_section:
-            # Loop through each article on the current page
-            for article in articles_section.find_all("article", class_="item"):
-                # Extract title
-                title = article.find("h3").get_text(strip=True) if article.find("h3") else None
-
-                # Extract URL
-                link = article.find("a", href=True)["href"] if article.find("a", href=True) else None
-
-                # Extract image URL (optional)
-                image = article.find("img")["src"] if article.find("img") else None
-
-                # Extract excerpt
-                excerpt = article.find("span", class_="item-excerpt").get_text(strip=True) if article.find("span", class_="item-excerpt") else None
-
-                # Extract author and date (within the item-meta div)
-                meta = article.find("div", class_="item-meta")
-                author = meta.find("span", class_="item-byline").get_text(strip=True) if meta and meta.find("span", class_="item-byline") else None
-                date = meta.find("span", class_="item-date").get_text(strip=True) if meta and meta.find("span", class_="item-date") else None
-
-                # Add the article data to the list
-                all_articles.append({
-                    "title": title,
-                    "link": link,
-                    "image": image,
-                    "excerpt": excerpt,
-                    "author": author,
-                    "date": date,
-                })
-
-    # Return all collected articles as a JSON response
-    return JSONResponse(content=all_articles)
+    # First three pages of PCWorld's accessories news
+    all_articles = await scrape_pcworld_category_async("accessories/news", pages=3)
+    return ORJSONResponse(content=all_articles)
 
 @app.get("/scrape-pcworld-windows/")
 async def scrape_pcworld_windows():
-    # Base URL of the page to scrape
-    base_url = "https://www.pcworld.com/windows/news/page/{}"
-
-    # Initialize a list to store all articles across pages
-    all_articles = []
-
-    # Loop through the first three pages
-    for page in range(1, 4):  # Pages 1 to 3
-        # Format the URL for each page
-        url = base_url.format(page)
-
-        
-        response = requests.get(url)
-        response.raise_for_status()  # ensure we got a successful response
-
-        # Parse the HTML content
-        soup = BeautifulSoup(response.text, 'lxml')
-
-        # Find the section containing the articles
-        articles_section = soup.find("div", class_="articleFeed-inner")
-
-        # Ensure the section was found
-        if articles_section:
-            # Loop through each article on the current page
-            for article in articles_section.find_all("article", class_="item"):
-                # Extract title
-                title = article.find("h3").get_text(strip=True) if article.find("h3") else None
-
-                # Extract URL
-                link = article.find("a", href=True)["href"] if article.find("a", href=True) else None
-
-                # Extract image URL (optional)
-                image = article.find("img")["src"] if article.find("img") else None
-
-                # Extract excerpt
-                excerpt = article.find("span", class_="item-excerpt").get_text(strip=True) if article.find("span", class_="item-excerpt") else None
-
-                # Extract author and date (within the item-meta div)
-                meta = article.find("div", class_="item-meta")
-                author = meta.find("span", class_="item-byline").get_text(strip=True) if meta and meta.find("span", class_="item-byline") else None
-                date = meta.find("span", class_="item-date").get_text(strip=True) if meta and meta.find("span", class_="item-date") else None
-
-                # Add the article data to the list
-                all_articles.append({
-                    "title": title,
-                    "link": link,
-                    "image": image,
-                    "excerpt": excerpt,
-                    "author": author,
-                    "date": date,
-                })
-
-    # Return all collected articles as a JSON response
-    return JSONResponse(content=all_articles)
-
-
-
+    # First three pages of PCWorld's Windows news
+    all_articles = await scrape_pcworld_category_async("windows/news", pages=3)
+    return ORJSONResponse(content=all_articles)
+
+
+
+
+# ---------- Cached sources ----------
+
+async def cached_pcworld_articles():
+    return await news_cache.get_or_fetch("PCWorld", scrape_pcworld_async)
+
+def rss_loader(source_name, feed_url):
+    """
+    Cache loader for a feed. A failed fetch raises rather than returning
+    [], so it never replaces the stale entry the cache is still serving.
+    """
+    return partial(fetch_rss_feed_async, source_name, feed_url, raise_errors=True)
+
+async def cached_rss_articles():
+    results = await asyncio.gather(*(
+        news_cache.get_or_fetch(source_name, rss_loader(source_name, feed_url))
+        for source_name, feed_url in RSS_FEEDS.items()
+    ), return_exceptions=True)
+    articles = []
+    for source_name, result in zip(RSS_FEEDS, results):
+        if isinstance(result, Exception):
+            logger.warning("Failed to fetch %s feed: %s", source_name, result)
+            continue
+        articles.extend(result)
+    return articles
+
+def cached_source_fetchers():
+    """Source name -> coroutine factory returning its cached articles"""
+    fetchers = {
+        source_name: partial(news_cache.get_or_fetch, source_name, rss_loader(source_name, feed_url))
+        for source_name, feed_url in RSS_FEEDS.items()
+    }
+    fetchers["PCWorld"] = cached_pcworld_articles
+    return fetchers
+
+# ---------- NDJSON streaming ----------
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def ndjson_line(item) -> bytes:
+    return orjson.dumps(item) + b"\n"
+
+def wants_ndjson(stream: bool, accept: Optional[str]) -> bool:
+    return stream or NDJSON_MEDIA_TYPE in (accept or "")
+
+async def stream_articles_ndjson(fetchers):
+    """
+    Yield one JSON line per article, source by source in the order the
+    sources finish. A failing source yields a single {"source", "error"} line.
+    """
+    async def run(source_name, fetch_articles):
+        try:
+            return source_name, await fetch_articles(), None
+        except Exception as e:
+            return source_name, None, f"{type(e).__name__}: {e}"
+
+    tasks = [asyncio.create_task(run(name, fetch_articles)) for name, fetch_articles in fetchers.items()]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            source_name, articles, error = await finished
+            if error is not None:
+                yield ndjson_line({"source": source_name, "error": error})
+                continue
+            if not articles:
+                continue
+            # Encode per source rather than per article to keep the number of writes low
+            yield b"".join(ndjson_line(article) for article in articles)
+    finally:
+        # Client went away: stop fetching for it
+        for task in tasks:
+            task.cancel()
 
 # ---------- Endpoints ----------
 
 @app.get("/scrape-pcworld-news/")
 async def scrape_pcworld_news():
-    pcworld_articles = scrape_pcworld()
-    return JSONResponse(content=pcworld_articles)
+    pcworld_articles = await cached_pcworld_articles()
+    return ORJSONResponse(content=pcworld_articles)
 
 @app.get("/scrape-all-news/")
-async def scrape_all_news():
-    combined_articles =  fetch_rss_articles() + scrape_pcworld()
-    return JSONResponse(content=combined_articles)
+async def scrape_all_news(
+    stream: bool = Query(False, description="Stream articles as NDJSON as each source finishes"),
+    accept: Optional[str] = Header(None),
+):
+    if wants_ndjson(stream, accept):
+        return StreamingResponse(
+            stream_articles_ndjson(cached_source_fetchers()),
+            media_type=NDJSON_MEDIA_TYPE,
+            # Proxies must pass lines through as they are produced
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Vary": "Accept"},
+        )
+    rss_articles, pcworld_articles = await asyncio.gather(
+        cached_rss_articles(), cached_pcworld_articles()
+    )
+    combined_articles = rss_articles + pcworld_articles
+    return ORJSONResponse(content=combined_articles, headers={"Vary": "Accept"})
 
 @app.post("/upload-image/")
-async def upload_image(file: UploadFile = File(...)):
+async def upload_image(
+    file: Optional[UploadFile] = File(None),
+    files: Optional[List[UploadFile]] = File(None),
+):
+    """Upload one image as ``file``, or a batch as repeated ``files`` fields"""
+    if files:
+        if file is not None:
+            files = [file] + files
+        if len(files) > UPLOAD_MAX_BATCH:
+            raise HTTPException(status_code=400, detail=f"At most {UPLOAD_MAX_BATCH} files per batch.")
+        return {"results": await image_store.store_many(files)}
+    if file is None:
+        raise HTTPException(status_code=422, detail="Send an image as 'file' or several as 'files'.")
     try:
-        image_url = upload_image_to_backblaze(file)
-        return {"image_url": image_url}
+        stored = await image_store.store(file)
+        return {"image_url": stored.image_url, "sha256": stored.sha256, "deduplicated": stored.deduplicated}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
@@ -185,11 +202,52 @@ async def upload_image(file: UploadFile = File(...)):
 
 # Tell FastAPI where your templates are located
 templates = Jinja2Templates(directory="templates")
+templates.env.filters["thumb"] = thumbnail_url
+
+@app.get("/img")
+async def image_thumbnail(request: Request, u: str, s: str, w: int = THUMB_WIDTHS[0]):
+    """Resized article image from the local thumbnail cache (see thumbnails.py)"""
+    url = decode_thumbnail_request(u, s)
+    if url is None:
+        raise HTTPException(status_code=403, detail="Invalid image signature")
+    if w not in THUMB_WIDTHS:
+        raise HTTPException(status_code=400, detail=f"Width must be one of {list(THUMB_WIDTHS)}")
+
+    fmt = preferred_format(request.headers.get("accept"))
+    try:
+        data = await thumbnail_cache.get(url, w, fmt)
+    except Exception:
+        # Fall back to the original rather than a broken image
+        return RedirectResponse(url, status_code=302, headers={"Cache-Control": "public, max-age=300"})
+    return Response(
+        content=data,
+        media_type=THUMB_FORMATS[fmt],
+        headers={"Cache-Control": THUMB_CACHE_CONTROL, "Vary": "Accept"},
+    )
+
+NEWS_SOURCES = ["PCWorld"] + list(RSS_FEEDS)
 
 @app.get("/news", response_class=HTMLResponse)
-async def news_page(request: Request):
-    articles = fetch_rss_articles()+ scrape_pcworld()
-    return templates.TemplateResponse("news.html", {
-        "request": request,
-        "articles": articles
-    })
\ No newline at end of file
+def news_page(
+    request: Request,
+    q: Optional[str] = None,
+    source: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    db: Session = Depends(get_db)
+):
+    def render():
+        # Only the requested page of stored articles is rendered
+        articles, total = search_articles(db, q=q, source=source, page=page)
+        return templates.get_template("news.html").render({
+            "request": request,
+            "articles": [serialize_article(article) for article in articles],
+            "sources": NEWS_SOURCES,
+            "q": q or "",
+            "source": source or "",
+            "page": page,
+            "pages": (total + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE,
+            "total": total,
+        })
+
+    key = (q or "", source or "", page)
+    return page_response(request, news_page_cache.get_or_render(key, render))
@@ -0,0 +1,113 @@
+"""Prometheus metrics for the fetch, parse, store and serve paths.
+
+Recording is a plain ``observe``/``inc`` on a prometheus_client metric. Set
+``PROMETHEUS_MULTIPROC_DIR`` to an empty directory shared by the workers
+before they start. Each process then writes its samples there, and
+``/metrics`` aggregates all of them.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+# Upstream pages and feeds typically take 50 ms - 5 s
+FETCH_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+# Parsing and DB work are mostly in the millisecond range
+FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+UPSTREAM_FETCH_SECONDS = Histogram(
+    "news_upstream_fetch_seconds", "Upstream GET latency, including retries",
+    ["host"], buckets=FETCH_BUCKETS,
+)
+UPSTREAM_BYTES = Counter(
+    "news_upstream_bytes", "Response bytes downloaded from upstream", ["host"],
+)
+PARSE_SECONDS = Histogram(
+    "news_parse_seconds", "Time to parse one downloaded page or feed",
+    ["source"], buckets=FAST_BUCKETS,
+)
+DB_SECONDS = Histogram(
+    "news_db_seconds", "Time spent in ingestion DB operations",
+    ["operation"], buckets=FAST_BUCKETS,
+)
+ENDPOINT_SECONDS = Histogram(
+    "news_endpoint_seconds", "Request latency of instrumented endpoints",
+    ["endpoint", "method", "status"], buckets=FAST_BUCKETS + (10.0, 30.0),
+)
+CACHE_LOOKUPS = Counter(
+    "news_cache_lookups", "Cache lookups by cache and outcome", ["cache", "result"],
+)
+ARTICLES_SAVED = Counter(
+    "news_articles_saved", "Articles inserted by ingestion", ["source"],
+)
+
+# Route paths whose latency goes into ENDPOINT_SECONDS
+INSTRUMENTED_ENDPOINTS = frozenset(["/scrape-all-news/", "/news", "/upload-image/"])
+
+
+@contextmanager
+def timed(histogram, *labels):
+    """Observe the block's duration on ``histogram`` with ``labels``"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.labels(*labels).observe(time.perf_counter() - started)
+
+
+class EndpointLatencyMiddleware:
+    """
+    Pure ASGI middleware recording ENDPOINT_SECONDS for the routes in
+    INSTRUMENTED_ENDPOINTS, up to the last byte of the response body
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the shared scope
+            path = getattr(scope.get("route"), "path", None)
+            if path in INSTRUMENTED_ENDPOINTS:
+                ENDPOINT_SECONDS.labels(path, scope["method"], str(status)).observe(
+                    time.perf_counter() - started
+                )
+
+
+def instrument_app(app):
+    """Record ENDPOINT_SECONDS for the routes in INSTRUMENTED_ENDPOINTS"""
+    app.add_middleware(EndpointLatencyMiddleware)
+
+
+def render_metrics():
+    """Body and content type for the /metrics endpoint"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, String, Text, DateTime, Float, ForeignKey, Index, UniqueConstraint, func, literal_column, text
 from sqlalchemy.orm import relationship
 from .database.database import Base
 from datetime import datetime
@@ -12,6 +12,86 @@ class NewsSource(Base):
     name = Column(String(255), nullable=False)
 
 
+class FeedValidator(Base):
+    """HTTP cache validators for an upstream feed or page, used for conditional GETs"""
+    __tablename__ = 'aipc_diagnosis_feedvalidator'
+
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(String(1000), nullable=False, unique=True)
+    source = Column(String(255), nullable=True)
+    etag = Column(String(255), nullable=True)
+    last_modified = Column(String(255), nullable=True)
+    # Size and parse time of the last full response, to account for 304 savings
+    content_length = Column(Integer, nullable=False, default=0)
+    parse_seconds = Column(Float, nullable=False, default=0.0)
+    checked_at = Column(DateTime, nullable=True)
+
+
+class SourceCheckpoint(Base):
+    """High-water mark of the newest items already ingested from a source"""
+    __tablename__ = 'aipc_diagnosis_sourcecheckpoint'
+
+    id = Column(Integer, primary_key=True, index=True)
+    source = Column(String(255), nullable=False, unique=True)
+    last_published_at = Column(DateTime, nullable=True)  # naive UTC
+    # JSON list of the most recent GUIDs/links, newest first
+    recent_ids = Column(Text, nullable=False, default='[]')
+    updated_at = Column(DateTime, nullable=True)
+
+
+class JobRun(Base):
+    """Last completed run of a locked job, shared by every worker's scheduler"""
+    __tablename__ = 'aipc_diagnosis_jobrun'
+
+    name = Column(String(255), primary_key=True)
+    # naive UTC
+    started_at = Column(DateTime, nullable=False)
+    completed_at = Column(DateTime, nullable=False)
+
+
+class JobRecord(Base):
+    """Snapshot of an ingestion job, so every worker can report on it"""
+    __tablename__ = 'aipc_diagnosis_jobrecord'
+
+    id = Column(String(32), primary_key=True)
+    key = Column(String(255), nullable=False, index=True)
+    status = Column(String(20), nullable=False)
+    # naive UTC; updated_at doubles as the owner's heartbeat
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+    data = Column(Text, nullable=False)  # JSON of Job.as_dict()
+
+
+class UploadedImage(Base):
+    """Content-addressed index of images uploaded to B2, keyed by SHA-256"""
+    __tablename__ = 'aipc_diagnosis_uploadedimage'
+
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), nullable=False)
+    bucket = Column(String(255), nullable=False)
+    file_name = Column(String(255), nullable=False)  # object key in the bucket
+    url = Column(String(1000), nullable=False)
+    content_type = Column(String(255), nullable=True)
+    size = Column(Integer, nullable=False, default=0)
+    original_filename = Column(String(255), nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint('sha256', 'bucket', name='uq_uploadedimage_sha256_bucket'),
+    )
+
+
+class ArticleFingerprint(Base):
+    """Canonical URL and SimHash of a stored article, for near-duplicate detection"""
+    __tablename__ = 'aipc_diagnosis_articlefingerprint'
+
+    id = Column(Integer, primary_key=True, index=True)
+    article_id = Column(Integer, nullable=False, unique=True)
+    canonical_url = Column(String(1000), nullable=False, index=True)
+    # 64-bit SimHash of title + excerpt, stored signed to fit a BIGINT
+    simhash = Column(BigInteger, nullable=True)
+    published_at = Column(DateTime, nullable=False)  # mirrors the article, for retention
+
 
 class NewsArticle(Base):
     __tablename__ = 'aipc_diagnosis_newsarticle'  # Django's actual table name
@@ -26,5 +106,30 @@ class NewsArticle(Base):
     published_at = Column(DateTime, nullable=False)
     content = Column(Text, nullable=True)
 
+    __table_args__ = (
+        # Keyset pagination for the read API: ORDER BY published_at DESC, id DESC,
+        # optionally filtered by source; retention walks the first one oldest-first
+        Index('ix_newsarticle_published_at_id', 'published_at', 'id'),
+        Index('ix_newsarticle_source_published_at_id', 'source', 'published_at', 'id'),
+        # Full-text search on Postgres; SQLite gets an FTS5 table (see search.py)
+        Index(
+            'ix_newsarticle_search',
+            text("to_tsvector('english'::regconfig, coalesce(title, '') || ' ' || coalesce(description, ''))"),
+            postgresql_using='gin',
+        ).ddl_if(dialect='postgresql'),
+    )
+
 
 
+def news_search_vector():
+    """
+    Postgres full-text document for an article; must stay the same
+    expression as ix_newsarticle_search so the planner uses the index.
+    """
+    empty, space = literal_column("''"), literal_column("' '")
+    return func.to_tsvector(
+        literal_column("'english'::regconfig"),
+        func.coalesce(NewsArticle.title, empty).concat(space).concat(
+            func.coalesce(NewsArticle.description, empty)
+        )
+    )
@@ -0,0 +1,156 @@
+"""Pre-rendered, pre-compressed HTML pages keyed by their query.
+
+A page is rendered once, compressed once per encoding (gzip, plus brotli when
+the ``brotli`` package is installed) and served from memory until an
+ingestion run changes the stored articles. Each variant carries a strong
+ETag so unchanged pages answer ``304 Not Modified``.
+"""
+import gzip
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Hashable
+
+from decouple import config
+from fastapi import Request
+from fastapi.responses import Response
+
+from .metrics import CACHE_LOOKUPS
+
+try:
+    import brotli  # optional dependency
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+PAGE_CACHE_MAX_ENTRIES = config('PAGE_CACHE_MAX_ENTRIES', default=256, cast=int)
+# Upper bound on a page's age; invalidation normally happens on ingestion, but
+# that only reaches the worker that ran it
+PAGE_CACHE_TTL = config('PAGE_CACHE_TTL', default=300, cast=int)
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 9
+
+
+@dataclass
+class RenderedPage:
+    # encoding ("identity", "gzip", "br") -> compressed body
+    bodies: Dict[str, bytes]
+    etag: str
+    rendered_at: float = field(default_factory=time.time)
+
+    def etag_for(self, encoding: str) -> str:
+        # Each encoding is its own representation, so it gets its own strong tag
+        if encoding == "identity":
+            return f'"{self.etag}"'
+        return f'"{self.etag}-{encoding}"'
+
+
+def render_page(html: str) -> RenderedPage:
+    raw = html.encode("utf-8")
+    bodies = {
+        "identity": raw,
+        "gzip": gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0),
+    }
+    if brotli is not None:
+        bodies["br"] = brotli.compress(raw, quality=BROTLI_QUALITY)
+    return RenderedPage(bodies=bodies, etag=hashlib.sha256(raw).hexdigest()[:32])
+
+
+def _accepted_encodings(header: str) -> set:
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if name:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def _choose_encoding(page: RenderedPage, accept_encoding: str) -> str:
+    accepted = _accepted_encodings(accept_encoding)
+    for encoding in ("br", "gzip"):
+        if encoding in page.bodies and (encoding in accepted or "*" in accepted):
+            return encoding
+    return "identity"
+
+
+def _etag_matches(if_none_match: str, page: RenderedPage) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return any(page.etag_for(encoding) in tags for encoding in page.bodies)
+
+
+def page_response(request: Request, page: RenderedPage, media_type: str = "text/html; charset=utf-8") -> Response:
+    """Serve the best variant of ``page`` for the request, or a 304"""
+    encoding = _choose_encoding(page, request.headers.get("accept-encoding", ""))
+    headers = {
+        "ETag": page.etag_for(encoding),
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "no-cache",
+    }
+    if _etag_matches(request.headers.get("if-none-match", ""), page):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=page.bodies[encoding], media_type=media_type, headers=headers)
+
+
+class PageCache:
+    """
+    Bounded LRU of rendered pages. ``invalidate`` bumps a generation so a
+    render that started before the invalidation is never stored.
+    """
+
+    def __init__(self, max_entries: int = PAGE_CACHE_MAX_ENTRIES, ttl: int = PAGE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.generation = 0
+        self._pages: "OrderedDict[Hashable, RenderedPage]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "renders": 0, "invalidations": 0}
+
+    def get_or_render(self, key: Hashable, render: Callable[[], str]) -> RenderedPage:
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None and time.time() - page.rendered_at < self.ttl:
+                self._pages.move_to_end(key)
+                self.counters["hits"] += 1
+                CACHE_LOOKUPS.labels("page", "hit").inc()
+                return page
+            self.counters["misses"] += 1
+            CACHE_LOOKUPS.labels("page", "miss").inc()
+            generation = self.generation
+
+        page = render_page(render())
+        with self._lock:
+            self.counters["renders"] += 1
+            if generation == self.generation:
+                self._pages[key] = page
+                self._pages.move_to_end(key)
+                while len(self._pages) > self.max_entries:
+                    self._pages.popitem(last=False)
+        return page
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            self._pages.clear()
+            self.counters["invalidations"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self.counters,
+                "entries": len(self._pages),
+                "generation": self.generation,
+                "brotli": brotli is not None,
+            }
+
+
+news_page_cache = PageCache()
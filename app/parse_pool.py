@@ -0,0 +1,100 @@
+"""Process-pool stage for CPU-bound HTML/feed parsing.
+
+Downloaded pages and feeds are handed to a bounded ``ProcessPoolExecutor`` so
+lxml/html.parser/feedparser work doesn't hold the GIL in the API process.
+Parse functions must be module-level and take/return plain data.
+
+``PARSE_POOL_WORKERS`` sets the pool size: 0 parses inline, and the default
+(-1) picks ``min(4, cpu_count - 1)``, or inline on single-core machines and
+serverless deployments such as Vercel, where worker processes don't pay off.
+
+Workers are started with forkserver (spawn where it is unavailable), never
+fork: the API process runs threads, and a forked child could inherit a
+lock one of them held.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, Optional
+
+from decouple import config
+
+logger = logging.getLogger(__name__)
+
+PARSE_POOL_WORKERS = config('PARSE_POOL_WORKERS', default=-1, cast=int)
+
+# Environment variables set by serverless platforms
+SERVERLESS_ENV_VARS = ("VERCEL", "AWS_LAMBDA_FUNCTION_NAME")
+
+
+def _pool_size() -> int:
+    if PARSE_POOL_WORKERS >= 0:
+        return PARSE_POOL_WORKERS
+    if any(os.environ.get(name) for name in SERVERLESS_ENV_VARS):
+        return 0
+    return min(4, (os.cpu_count() or 1) - 1)
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_disabled = False
+# At most two queued jobs per worker; one semaphore per event loop
+_pending_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _mp_context():
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool, _pool_disabled
+    if _pool is None and not _pool_disabled:
+        size = _pool_size()
+        if size <= 0:
+            _pool_disabled = True
+            logger.info("Parsing inline (no parse pool)")
+        else:
+            _pool = ProcessPoolExecutor(max_workers=size, mp_context=_mp_context())
+            logger.info("Parse pool started with %d workers", size)
+    return _pool
+
+
+def _pending_limit() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    limit = _pending_limits.get(loop)
+    if limit is None:
+        limit = _pending_limits[loop] = asyncio.Semaphore(2 * max(1, _pool_size()))
+    return limit
+
+
+async def run_parse(func: Callable[..., Any], *args) -> Any:
+    """Run ``func(*args)`` in the parse pool, or inline when there is none"""
+    global _pool
+    pool = _get_pool()
+    if pool is None:
+        return func(*args)
+
+    async with _pending_limit():
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, partial(func, *args))
+        except BrokenProcessPool:
+            logger.error("Parse pool broke; restarting it and parsing inline")
+            if _pool is pool:
+                _pool = None
+                # Reap the dead pool's processes and management thread
+                pool.shutdown(wait=False, cancel_futures=True)
+            return func(*args)
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,205 @@
+"""Retention for stored news articles.
+
+Expired rows are deleted in bounded batches, each in its own short
+transaction. A batch picks the oldest ids through the
+``ix_newsarticle_published_at_id`` index, so no run scans the whole table or
+holds long locks while the API reads. ``RETENTION_THROTTLE`` adds a pause
+between batches.
+
+On Postgres the article table can be range-partitioned by day on
+``published_at``, with partitions named ``<table>_pYYYYMMDD``. With
+``RETENTION_PARTITIONED`` enabled, whole expired partitions are dropped, upcoming
+ones are created, and only the boundary day is deleted row by row.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Callable, List, Optional
+
+from decouple import config
+from sqlalchemy import delete, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import ArticleFingerprint, NewsArticle
+
+logger = logging.getLogger(__name__)
+
+RETENTION_DAYS = config('RETENTION_DAYS', default=7, cast=int)
+RETENTION_BATCH_SIZE = config('RETENTION_BATCH_SIZE', default=1000, cast=int)
+# Seconds to sleep between batches, to leave room for other writers
+RETENTION_THROTTLE = config('RETENTION_THROTTLE', default=0.0, cast=float)
+RETENTION_PARTITIONED = config('RETENTION_PARTITIONED', default=False, cast=bool)
+# Daily partitions created ahead of time when RETENTION_PARTITIONED is on
+RETENTION_PARTITIONS_AHEAD = config('RETENTION_PARTITIONS_AHEAD', default=3, cast=int)
+
+ARTICLE_TABLE = NewsArticle.__tablename__
+
+
+@dataclass
+class RetentionProgress:
+    cutoff: datetime
+    deleted: int = 0
+    batches: int = 0
+    partitions_dropped: List[str] = field(default_factory=list)
+    partitions_created: List[str] = field(default_factory=list)
+    started_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    @property
+    def seconds(self) -> float:
+        return (self.finished_at or time.time()) - self.started_at
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        data["cutoff"] = self.cutoff.isoformat()
+        data["seconds"] = round(self.seconds, 3)
+        return data
+
+
+# Progress of the running (or last) purge, reported on the stats endpoint
+RETENTION_STATS = {"current": None, "last": None}
+
+
+def partition_name(day: date) -> str:
+    return f"{ARTICLE_TABLE}_p{day:%Y%m%d}"
+
+
+async def _is_partitioned(db: AsyncSession) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    result = await db.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"),
+        {"table": ARTICLE_TABLE},
+    )
+    return result.first() is not None
+
+
+async def _daily_partitions(db: AsyncSession) -> List[str]:
+    result = await db.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits"
+            " JOIN pg_class child ON child.oid = pg_inherits.inhrelid"
+            " WHERE pg_inherits.inhparent = to_regclass(:table)"
+        ),
+        {"table": ARTICLE_TABLE},
+    )
+    prefix = f"{ARTICLE_TABLE}_p"
+    return [name for (name,) in result if name.startswith(prefix) and name[len(prefix):].isdigit()]
+
+
+async def drop_expired_partitions(db: AsyncSession, cutoff: datetime, progress: RetentionProgress):
+    """Drop daily partitions that end at or before ``cutoff``"""
+    for name in sorted(await _daily_partitions(db)):
+        day = datetime.strptime(name.rsplit("_p", 1)[1], "%Y%m%d")
+        if day + timedelta(days=1) > cutoff:
+            continue
+        # Detach first so the parent is only locked briefly
+        await db.execute(text(f'ALTER TABLE "{ARTICLE_TABLE}" DETACH PARTITION "{name}"'))
+        await db.execute(text(f'DROP TABLE "{name}"'))
+        await db.commit()
+        progress.partitions_dropped.append(name)
+        logger.info("Dropped expired partition %s", name)
+
+
+async def ensure_daily_partitions(db: AsyncSession, progress: RetentionProgress,
+                                  days_ahead: int = RETENTION_PARTITIONS_AHEAD):
+    """Create the partitions for today and the next ``days_ahead`` days"""
+    existing = set(await _daily_partitions(db))
+    today = datetime.utcnow().date()
+    for offset in range(days_ahead + 1):
+        day = today + timedelta(days=offset)
+        name = partition_name(day)
+        if name in existing:
+            continue
+        await db.execute(text(
+            f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{ARTICLE_TABLE}"'
+            f" FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+        ))
+        await db.commit()
+        progress.partitions_created.append(name)
+        logger.info("Created partition %s", name)
+
+
+async def delete_in_batches(
+    db: AsyncSession,
+    cutoff: datetime,
+    progress: RetentionProgress,
+    batch_size: int = RETENTION_BATCH_SIZE,
+    throttle: float = RETENTION_THROTTLE,
+    on_progress: Optional[Callable[[RetentionProgress], None]] = None,
+):
+    """Delete rows published before ``cutoff``, oldest first, one batch per transaction"""
+    while True:
+        ids = (await db.execute(
+            select(NewsArticle.id)
+            .where(NewsArticle.published_at < cutoff)
+            .order_by(NewsArticle.published_at, NewsArticle.id)
+            .limit(batch_size)
+        )).scalars().all()
+        if not ids:
+            break
+
+        await db.execute(delete(ArticleFingerprint).where(ArticleFingerprint.article_id.in_(ids)))
+        result = await db.execute(delete(NewsArticle).where(NewsArticle.id.in_(ids)))
+        await db.commit()
+        progress.deleted += result.rowcount or 0
+        progress.batches += 1
+        if on_progress is not None:
+            on_progress(progress)
+        logger.debug("Retention batch %d: %d rows deleted so far", progress.batches, progress.deleted)
+
+        if len(ids) < batch_size:
+            break
+        if throttle:
+            await asyncio.sleep(throttle)
+
+
+async def purge_old_articles(
+    db: AsyncSession,
+    days: int = RETENTION_DAYS,
+    batch_size: int = RETENTION_BATCH_SIZE,
+    throttle: float = RETENTION_THROTTLE,
+    partitioned: bool = RETENTION_PARTITIONED,
+    on_progress: Optional[Callable[[RetentionProgress], None]] = None,
+) -> RetentionProgress:
+    """
+    Remove articles published more than ``days`` ago.
+
+    Returns the run's progress. ``RETENTION_STATS["current"]`` tracks it
+    while the purge runs.
+    """
+    progress = RetentionProgress(cutoff=datetime.utcnow() - timedelta(days=days))
+    RETENTION_STATS["current"] = progress
+    try:
+        if partitioned and await _is_partitioned(db):
+            await drop_expired_partitions(db, progress.cutoff, progress)
+            await ensure_daily_partitions(db, progress)
+            # Dropped partitions take their rows, but not those rows' fingerprints
+            if progress.partitions_dropped:
+                await db.execute(delete(ArticleFingerprint).where(ArticleFingerprint.published_at < progress.cutoff))
+                await db.commit()
+        await delete_in_batches(db, progress.cutoff, progress, batch_size, throttle, on_progress)
+    finally:
+        progress.finished_at = time.time()
+        RETENTION_STATS["current"] = None
+        RETENTION_STATS["last"] = progress.as_dict()
+
+    logger.info(
+        "Retention removed %d articles older than %s in %d batches (%d partitions dropped) in %.2fs",
+        progress.deleted, progress.cutoff, progress.batches,
+        len(progress.partitions_dropped), progress.seconds
+    )
+    return progress
+
+
+def retention_stats() -> dict:
+    current = RETENTION_STATS["current"]
+    return {
+        "running": current.as_dict() if current is not None else None,
+        "last": RETENTION_STATS["last"],
+        "batch_size": RETENTION_BATCH_SIZE,
+        "throttle": RETENTION_THROTTLE,
+        "partitioned": RETENTION_PARTITIONED,
+    }
@@ -1,18 +1,43 @@
-from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, FastAPI, HTTPException,BackgroundTasks
+import base64
+import json
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from functools import partial
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
-from sqlalchemy import select, delete
+from apscheduler.jobstores.base import ConflictingIdError
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from decouple import config
+from sqlalchemy import select, insert, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from ..database.database import get_db,SessionLocal
-from ..models import NewsSource, NewsArticle
+from ..database.database import get_db, AsyncSessionLocal, async_engine, DATABASE_URL
+from ..models import NewsSource, NewsArticle, FeedValidator, SourceCheckpoint
 from contextlib import asynccontextmanager
 from sqlalchemy.exc import IntegrityError
 import logging
-from ..helper import scrape_pcworld, fetch_rss_articles, convert_relative_time_to_date
+from ..helper import scrape_pcworld_async, fetch_rss_feed_async, RSS_FEEDS
+from ..dates import date_normalizer, to_naive_utc
+from ..articles import Article
+from .. import fetcher, parse_pool
+from ..fetcher import Validator, ValidatorStore, CONDITIONAL_GET_STATS
+from ..checkpoints import Checkpoint, CheckpointStore
+from ..cache import news_cache
+from ..page_cache import news_page_cache
+from ..jobs import job_runner, set_stage, report_progress, JobSkipped
+from ..locks import job_lock, last_run_started, record_run
+from ..retention import purge_old_articles, retention_stats, RETENTION_DAYS
+from ..uploads import UPLOAD_STATS
+from ..dedupe import drop_near_duplicates, save_fingerprints, index_fingerprints, fingerprint_index
+from ..metrics import timed, ARTICLES_SAVED, DB_SECONDS
+from ..search import search_articles, SEARCH_PAGE_SIZE
+from ..thumbnails import schedule_prewarm, stop_prewarm, thumbnail_cache, THUMB_PREWARM
 import re
-from typing import Optional
+from typing import List, Optional
 import logging
 import asyncio
 
@@ -27,6 +52,7 @@ NEWS_EXECUTION_STATS = {
     "total_articles_fetched": 0,
     "total_articles_saved": 0,
     "total_articles_deleted": 0,
+    "skipped_runs": 0,
     "last_error": None
 }
 
@@ -37,167 +63,494 @@ router = APIRouter(
     responses={404: {"description": "Not found"}}
 )
 
-scheduler = AsyncIOScheduler()
+# "sqlalchemy" keeps scheduled jobs in the database (SCHEDULER_JOBSTORE_URL,
+# DATABASE_URL by default) so restarts neither lose nor reset them.
+# APScheduler 3 does not support several schedulers sharing one job store,
+# so with it only the worker holding SCHEDULER_LEADER_LOCK runs a scheduler;
+# the others retry every SCHEDULER_LEADER_RETRY_SECONDS to take over. The
+# leader checks its lock every SCHEDULER_LEADER_CHECK_SECONDS and stops its
+# scheduler when the lock may have been lost.
+SCHEDULER_JOBSTORE = config('SCHEDULER_JOBSTORE', default='memory')
+SCHEDULER_JOBSTORE_URL = config('SCHEDULER_JOBSTORE_URL', default=DATABASE_URL)
+SCHEDULER_LEADER_LOCK = "news_scheduler_leader"
+SCHEDULER_LEADER_RETRY_SECONDS = config('SCHEDULER_LEADER_RETRY_SECONDS', default=60, cast=int)
+SCHEDULER_LEADER_CHECK_SECONDS = config('SCHEDULER_LEADER_CHECK_SECONDS', default=30, cast=int)
+NEWS_JOB_ID = "news_scraping_hourly"
+NEWS_JOB_INTERVAL = timedelta(hours=1)
+# A scheduled run is skipped when a completed run started this recently.
+# Every worker's scheduler fires once per interval, so this keeps it to one
+# run per interval; the slack lets the next run start a little early.
+NEWS_JOB_MIN_GAP = timedelta(minutes=config('NEWS_JOB_MIN_GAP_MINUTES', default=55, cast=int))
+# Lock shared by the scheduled job and manual triggers
+NEWS_JOB_LOCK = "news_ingestion"
+
+
+def create_scheduler() -> AsyncIOScheduler:
+    jobstores = {}
+    if SCHEDULER_JOBSTORE == 'sqlalchemy':
+        jobstores["default"] = SQLAlchemyJobStore(url=SCHEDULER_JOBSTORE_URL)
+    return AsyncIOScheduler(
+        jobstores=jobstores,
+        job_defaults={
+            # A late or backed-up job runs once, and never twice at the same time
+            "coalesce": True,
+            "max_instances": 1,
+            "misfire_grace_time": 300,
+        },
+    )
 
-@asynccontextmanager
-async def lifespan(app:FastAPI):
-    # Start scheduler on app startup
+
+scheduler = create_scheduler()
+
+
+def start_scheduler():
     if not scheduler.running:
         scheduler.start()
         logger.info("News Scheduler started at: %s", datetime.now())
-    
-    # Add main news job (runs hourly)
-    news_job = scheduler.add_job(
-        news_scraping_job_wrapper,
-        IntervalTrigger(hours=1),
-        id="news_scraping_hourly",
-        replace_existing=True
-    )
-    
-    logger.info("News scraping job scheduled. Next run: %s", news_job.next_run_time)
-    
+
+    # Add main news job (runs hourly). A persistent store already has it
+    # from an earlier start; re-adding would push its next run back.
+    news_job = scheduler.get_job(NEWS_JOB_ID)
+    if news_job is None:
+        try:
+            news_job = scheduler.add_job(
+                news_scraping_job_wrapper,
+                IntervalTrigger(seconds=NEWS_JOB_INTERVAL.total_seconds()),
+                id=NEWS_JOB_ID,
+                replace_existing=SCHEDULER_JOBSTORE == 'memory'
+            )
+        except ConflictingIdError:
+            # Added to the shared store by an earlier leader
+            news_job = scheduler.get_job(NEWS_JOB_ID)
+
+    logger.info("News scraping job scheduled. Next run: %s", news_job and news_job.next_run_time)
+
+
+async def lead_scheduler():
+    """Run the scheduler while this worker holds the leader lock"""
+    while True:
+        leading = False
+        try:
+            async with job_lock(SCHEDULER_LEADER_LOCK) as lock:
+                if lock:
+                    leading = True
+                    start_scheduler()
+                    while await lock.alive():
+                        await asyncio.sleep(SCHEDULER_LEADER_CHECK_SECONDS)
+                    logger.warning("Lost the scheduler leader lock; stopping the scheduler")
+        except Exception:
+            # e.g. the unlock on a dropped connection; the election starts over
+            logger.exception("Scheduler leader election failed")
+        if leading and scheduler.running:
+            scheduler.shutdown(wait=False)
+        await asyncio.sleep(SCHEDULER_LEADER_RETRY_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app:FastAPI):
+    # Tables and indexes come from app.database.migrate, run once per deploy,
+    # not from here. Start scheduler on app startup
+    leader = None
+    if SCHEDULER_JOBSTORE == 'sqlalchemy':
+        leader = asyncio.create_task(lead_scheduler())
+    else:
+        start_scheduler()
+
     yield
-    
+
     # Cleanup on shutdown
     if scheduler.running:
         scheduler.shutdown(wait=False)
         logger.info("News Scheduler stopped at: %s", datetime.now())
+    if leader is not None:
+        leader.cancel()
+        try:
+            await leader
+        except asyncio.CancelledError:
+            pass
+
+    await stop_prewarm()
+    await fetcher.aclose()
+    parse_pool.shutdown()
+    await async_engine.dispose()
 
 async def news_scraping_job_wrapper():
     """Wrapper for the news scraping job with proper error handling"""
-    start_time = datetime.now()
-    NEWS_EXECUTION_STATS["last_run"] = start_time
-    NEWS_EXECUTION_STATS["total_runs"] += 1
-    
-    try:
-        async with get_db() as db:
-            # First clean old articles
-            delete_result = clean_old_articles(db)
-            NEWS_EXECUTION_STATS["total_articles_deleted"] += delete_result["deleted"]
-            
-            # Then fetch and store new articles
-            fetch_result = await fetch_and_store_news(db)
-            NEWS_EXECUTION_STATS["total_articles_fetched"] += fetch_result["fetched"]
-            NEWS_EXECUTION_STATS["total_articles_saved"] += fetch_result["saved"]
-            
-            logger.info(
-                "News job completed in %.2f seconds: %d fetched, %d saved, %d deleted",
-                (datetime.now() - start_time).total_seconds(),
-                fetch_result["fetched"],
-                fetch_result["saved"],
-                delete_result["deleted"]
-            )
-            
-    except Exception as e:
-        error_msg = f"News job failed: {str(e)}"
-        logger.error(error_msg, exc_info=True)
-        NEWS_EXECUTION_STATS["last_error"] = error_msg
-        raise  # Re-raise to let APScheduler handle retries
-
-def clean_old_articles(db: Session, days: int = 7) -> dict:
-    """Delete articles older than specified days"""
-    cutoff_date = datetime.now() - timedelta(days=days)
+    # Shares the job queue with manual triggers, so a trigger during a
+    # scheduled run joins it instead of scraping twice
+    job = job_runner.submit(NEWS_JOB_LOCK, run_news_job, min_gap=NEWS_JOB_MIN_GAP, trigger="schedule")
+    await job.wait()  # Re-raises failures to let APScheduler handle retries
+
+async def run_news_job(clean_first: bool = True, days_to_keep: int = RETENTION_DAYS,
+                       min_gap: Optional[timedelta] = None) -> dict:
+    """
+    One ingestion run: retention, then fetch and store. With ``min_gap`` the
+    run is skipped if a completed run started less than ``min_gap`` ago.
+    """
+    # Every worker runs a scheduler; only the one holding the lock ingests
+    async with job_lock(NEWS_JOB_LOCK) as acquired:
+        if not acquired:
+            NEWS_EXECUTION_STATS["skipped_runs"] += 1
+            raise JobSkipped("Ingestion is already running in another worker")
+
+        started_at = datetime.utcnow()
+        if min_gap is not None:
+            last_started = await last_run_started(NEWS_JOB_LOCK)
+            if last_started is not None and started_at - last_started < min_gap:
+                NEWS_EXECUTION_STATS["skipped_runs"] += 1
+                raise JobSkipped(f"Ingestion already ran at {last_started.isoformat()} UTC")
+
+        start_time = datetime.now()
+        NEWS_EXECUTION_STATS["last_run"] = start_time
+        NEWS_EXECUTION_STATS["total_runs"] += 1
 
-    stmt = delete(NewsArticle).where(NewsArticle.published_at < cutoff_date)
-    result = db.execute(stmt)
-    db.commit()
+        try:
+            async with AsyncSessionLocal() as db:
+                # First clean old articles
+                delete_result = {"deleted": 0}
+                if clean_first:
+                    set_stage("retention")
+                    delete_result = await clean_old_articles(db, days=days_to_keep)
+                    NEWS_EXECUTION_STATS["total_articles_deleted"] += delete_result["deleted"]
+
+                # Then fetch and store new articles
+                fetch_result = await fetch_and_store_news(db)
+                NEWS_EXECUTION_STATS["total_articles_fetched"] += fetch_result["fetched"]
+                NEWS_EXECUTION_STATS["total_articles_saved"] += fetch_result["saved"]
+
+                logger.info(
+                    "News job completed in %.2f seconds: %d fetched, %d saved, %d deleted",
+                    (datetime.now() - start_time).total_seconds(),
+                    fetch_result["fetched"],
+                    fetch_result["saved"],
+                    delete_result["deleted"]
+                )
+            await record_run(NEWS_JOB_LOCK, started_at)
+            return {"deleted": delete_result["deleted"], **fetch_result}
 
-    deleted_count = result.rowcount if result and hasattr(result, "rowcount") else 0
+        except Exception as e:
+            error_msg = f"News job failed: {str(e)}"
+            logger.error(error_msg, exc_info=True)
+            NEWS_EXECUTION_STATS["last_error"] = error_msg
+            raise
 
-    logger.info("Deleted %d articles older than %s", deleted_count, cutoff_date)
+async def clean_old_articles(db: AsyncSession, days: int = RETENTION_DAYS) -> dict:
+    """Delete articles older than specified days, in indexed batches"""
+    progress = await purge_old_articles(db, days=days)
+    if progress.deleted or progress.partitions_dropped:
+        news_page_cache.invalidate()
 
     return {
-        "deleted": deleted_count,
-        "cutoff_date": cutoff_date.isoformat(),
+        "deleted": progress.deleted,
+        "batches": progress.batches,
+        "partitions_dropped": progress.partitions_dropped,
+        "cutoff_date": progress.cutoff.isoformat(),
         "timestamp": datetime.now().isoformat()
     }
 
 
-async def fetch_and_store_news(db: Session) -> dict:
-    """Main news fetching and storage logic"""
-    pcworld_articles = scrape_pcworld()
-    rss_articles = fetch_rss_articles()
-    all_articles = pcworld_articles + rss_articles
+# Batch sizes for the ingest path; both stay well below driver parameter limits
+URL_LOOKUP_CHUNK_SIZE = 500
+INSERT_CHUNK_SIZE = 500
 
-    if not all_articles:
-        logger.info("No new articles found in this run")
-        return {"fetched": 0, "saved": 0}
 
-    saved_count = 0
+# Time allowed for one source's fetch and parse; storing is not included
+INGEST_SOURCE_TIMEOUT = config('INGEST_SOURCE_TIMEOUT', default=120.0, cast=float)
 
-    for article in all_articles:
-        try:
-            link = article.get("link")
-            if not link:
-                logger.warning("Skipping article with missing URL: %s", article)
-                continue
-
-            # Check for duplicate by URL
-            existing_article = db.execute(
-                select(NewsArticle).where(NewsArticle.url == link)
-            ).scalar_one_or_none()
-
-            if existing_article:
-                logger.info("Duplicate found by URL, skipping: %s", link)
-                continue
-
-            saved = await process_single_article(db, article)
-            if saved:
-                saved_count += 1
-
-        except IntegrityError as ie:
-            db.rollback()
-            logger.warning(f"IntegrityError (possibly duplicate): {article.get('link')} — {ie}")
-        except Exception as e:
-            db.rollback()
-            logger.error(f"Failed to process article '{article.get('link')}': {str(e)}")
+# Result of each source's last ingestion, reported on the stats endpoint
+SOURCE_RESULTS = {}
+
+
+@dataclass
+class SourceResult:
+    source: str
+    latency: float = 0.0
+    bytes: int = 0
+    entries: int = 0
+    saved: int = 0
+    error: Optional[str] = None
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "latency": round(self.latency, 3)}
+
+
+def ingestion_sources(validators: ValidatorStore, checkpoints: CheckpointStore) -> dict:
+    """Source name -> coroutine factory returning that source's new articles"""
+    sources = {"PCWorld": partial(scrape_pcworld_async, validators, checkpoints)}
+    for source_name, feed_url in RSS_FEEDS.items():
+        sources[source_name] = partial(
+            fetch_rss_feed_async, source_name, feed_url, validators, checkpoints, raise_errors=True
+        )
+    return sources
 
-    db.commit()
+
+async def ingest_source(db: AsyncSession, source: str, scrape, validators: ValidatorStore,
+                        checkpoints: CheckpointStore, store_lock: asyncio.Lock) -> SourceResult:
+    """
+    Fetch one source within INGEST_SOURCE_TIMEOUT and store its articles
+    right away. Failures are recorded on the result, never raised.
+    """
+    result = SourceResult(source)
+    saved_rows = []
+    bytes_before = CONDITIONAL_GET_STATS.get(source, {}).get("bytes_downloaded", 0)
+    started = time.perf_counter()
+    report_progress(source, status="fetching")
+    try:
+        articles = await asyncio.wait_for(scrape(), INGEST_SOURCE_TIMEOUT)
+        result.entries = len(articles)
+        report_progress(source, status="storing", entries=result.entries)
+        # The session is shared, so sources take turns writing
+        async with store_lock:
+            try:
+                if articles:
+                    saved_rows = await store_articles(db, articles)
+                    result.saved = len(saved_rows)
+                # Only move the marks forward once the articles are safely stored
+                await save_checkpoints(db, checkpoints, sources=[source])
+                await save_validators(db, validators, source=source)
+            except Exception:
+                await db.rollback()
+                raise
+    except Exception as e:
+        result.error = (
+            f"Timed out after {INGEST_SOURCE_TIMEOUT:g}s" if isinstance(e, asyncio.TimeoutError)
+            else f"{type(e).__name__}: {e}"
+        )
+        # Unsaved validators would make the next run skip these pages with a 304
+        validators.discard(source)
+        logger.warning("Ingestion of %s failed: %s", source, result.error)
+    result.latency = time.perf_counter() - started
+    result.bytes = CONDITIONAL_GET_STATS.get(source, {}).get("bytes_downloaded", 0) - bytes_before
+    if saved_rows and THUMB_PREWARM:
+        # Card thumbnails of the new articles are ready before anyone opens
+        # /news; warmed in the background so the ingestion lock is not held
+        schedule_prewarm(row["image_url"] for row in saved_rows)
+
+    summary = result.as_dict()
+    del summary["source"]
+    SOURCE_RESULTS[source] = {**summary, "finished_at": datetime.now().isoformat()}
+    report_progress(source, status="failed" if result.error else "done", **summary)
+    return result
+
+
+async def fetch_and_store_news(db: AsyncSession) -> dict:
+    """Main news fetching and storage logic"""
+    # Unchanged feeds and pages answer 304 and contribute no articles, and
+    # the per-source checkpoints drop entries that were already ingested
+    validators = await load_validators(db)
+    checkpoints = await load_checkpoints(db)
+
+    # Sources run side by side; each stores its articles as soon as it is
+    # done, and a slow or failing source only affects its own result
+    set_stage("ingesting")
+    store_lock = asyncio.Lock()
+    results = await asyncio.gather(*(
+        ingest_source(db, source, scrape, validators, checkpoints, store_lock)
+        for source, scrape in ingestion_sources(validators, checkpoints).items()
+    ))
+
+    fetched = sum(result.entries for result in results)
+    saved_count = sum(result.saved for result in results)
+    if saved_count:
+        news_page_cache.invalidate()
+    if not fetched:
+        logger.info("No new articles found in this run")
 
     return {
-        "fetched": len(all_articles),
+        "fetched": fetched,
         "saved": saved_count,
+        "failed_sources": [result.source for result in results if result.error],
+        "sources": {result.source: result.as_dict() for result in results},
         "timestamp": datetime.now().isoformat()
     }
 
 
-async def process_single_article(db: Session, article: dict) -> bool:
-    """Process and save a single article with proper validation"""
-    link = article.get("link")
-    title = article.get("title")
-
-    if not link or not title:
-        logger.warning("Skipping article missing link or title")
-        return False
-
-    # Double-check for duplicate by URL
-    existing = db.execute(
-        select(NewsArticle).where(NewsArticle.url == link)
-    ).scalar_one_or_none()
-    if existing:
-        return False
-
-    source_name = article.get("source", "Unknown")
-
-    # Parse published date if available
-    published_at = None
-    if article.get("date"):
-        published_at = convert_relative_time_to_date(article["date"])
-
-    # Create and add new article
-    new_article = NewsArticle(
-        source=source_name,
-        author=article.get("author"),
-        title=title,
-        description=article.get("excerpt") or article.get("description"),
-        url=link,
-        image_url=article.get("image"),
-        published_at=published_at or datetime.now(),
-        content=article.get("content", "")
-    )
+async def load_validators(db: AsyncSession) -> ValidatorStore:
+    """Load the stored ETag/Last-Modified validators for conditional fetches"""
+    rows = (await db.execute(select(FeedValidator))).scalars().all()
+    return ValidatorStore({
+        row.url: Validator(
+            etag=row.etag,
+            last_modified=row.last_modified,
+            content_length=row.content_length or 0,
+            parse_seconds=row.parse_seconds or 0.0,
+        )
+        for row in rows
+    })
+
+
+async def save_validators(db: AsyncSession, validators: ValidatorStore, source: Optional[str] = None):
+    """Persist validators for URLs that returned a full response this run"""
+    urls = [
+        url for url in validators.changed
+        if source is None or validators.sources.get(url) == source
+    ]
+    if not urls:
+        return
+
+    existing = {
+        row.url: row
+        for row in (await db.execute(
+            select(FeedValidator).where(FeedValidator.url.in_(urls))
+        )).scalars()
+    }
+    now = datetime.now()
+    for url in urls:
+        validator = validators.validators[url]
+        row = existing.get(url)
+        if row is None:
+            row = FeedValidator(url=url)
+            db.add(row)
+        row.source = validators.sources.get(url)
+        row.etag = validator.etag
+        row.last_modified = validator.last_modified
+        row.content_length = validator.content_length
+        row.parse_seconds = validator.parse_seconds
+        row.checked_at = now
+    await db.commit()
+    validators.changed.difference_update(urls)
+
+
+async def load_checkpoints(db: AsyncSession) -> CheckpointStore:
+    """Load the per-source high-water marks"""
+    rows = (await db.execute(select(SourceCheckpoint))).scalars().all()
+    return CheckpointStore({
+        row.source: Checkpoint(row.source, row.last_published_at, json.loads(row.recent_ids or "[]"))
+        for row in rows
+    })
+
+
+async def save_checkpoints(db: AsyncSession, checkpoints: CheckpointStore,
+                           sources: Optional[List[str]] = None):
+    """Advance and persist the marks of sources that produced new items"""
+    pending = {
+        source: checkpoint
+        for source, checkpoint in checkpoints.checkpoints.items()
+        if checkpoint.has_pending and (sources is None or source in sources)
+    }
+    if not pending:
+        return
+
+    existing = {
+        row.source: row
+        for row in (await db.execute(
+            select(SourceCheckpoint).where(SourceCheckpoint.source.in_(list(pending)))
+        )).scalars()
+    }
+    now = datetime.now()
+    for source, checkpoint in pending.items():
+        checkpoint.advance()
+        row = existing.get(source)
+        if row is None:
+            row = SourceCheckpoint(source=source)
+            db.add(row)
+        row.last_published_at = checkpoint.last_published_at
+        row.recent_ids = json.dumps(checkpoint.recent_ids)
+        row.updated_at = now
+    await db.commit()
+
+
+async def store_articles(db: AsyncSession, articles: List[Article]) -> List[dict]:
+    """
+    Insert the articles whose URL is not stored yet.
+
+    Existing URLs are looked up with one IN query per chunk, near-duplicates
+    of stored articles are dropped (see dedupe.py), and the new rows are
+    bulk-inserted with their fingerprints in a single transaction. Returns
+    the rows saved.
+    """
+    rows = []
+    seen_links = set()
+    for article in articles:
+        row = build_article_row(article)
+        if row is None or row["url"] in seen_links:
+            continue
+        seen_links.add(row["url"])
+        rows.append(row)
+
+    with timed(DB_SECONDS, "dedupe"):
+        known_urls = await existing_urls(db, [row["url"] for row in rows])
+    new_rows = [row for row in rows if row["url"] not in known_urls]
+    if known_urls:
+        logger.info("Skipping %d articles already stored", len(known_urls))
+    with timed(DB_SECONDS, "near_dedupe"):
+        unique_rows, fingerprints = await drop_near_duplicates(db, new_rows)
+    if len(unique_rows) < len(new_rows):
+        logger.info("Skipping %d near-duplicate articles", len(new_rows) - len(unique_rows))
+    new_rows = unique_rows
+    if not new_rows:
+        return []
+
+    insert_returning_id = insert(NewsArticle).returning(NewsArticle.id, sort_by_parameter_order=True)
+    try:
+        with timed(DB_SECONDS, "insert"):
+            article_ids = []
+            for start in range(0, len(new_rows), INSERT_CHUNK_SIZE):
+                result = await db.execute(insert_returning_id, new_rows[start:start + INSERT_CHUNK_SIZE])
+                article_ids.extend(result.scalars())
+            await save_fingerprints(db, article_ids, fingerprints)
+            await db.commit()
+        index_fingerprints(article_ids, fingerprints)
+        count_saved(new_rows)
+        return new_rows
+    except IntegrityError as ie:
+        await db.rollback()
+        logger.warning(f"IntegrityError in bulk insert, retrying row by row: {ie}")
+
+    # Fall back to per-row savepoints so one bad row doesn't drop the batch
+    saved_rows, article_ids, saved_fingerprints = [], [], []
+    with timed(DB_SECONDS, "insert_row_by_row"):
+        for row, fingerprint in zip(new_rows, fingerprints):
+            try:
+                async with db.begin_nested():
+                    article_id = (await db.execute(insert(NewsArticle).returning(NewsArticle.id), row)).scalar_one()
+                    await save_fingerprints(db, [article_id], [fingerprint])
+                saved_rows.append(row)
+                article_ids.append(article_id)
+                saved_fingerprints.append(fingerprint)
+            except IntegrityError as ie:
+                logger.warning(f"IntegrityError (possibly duplicate): {row['url']} — {ie}")
+        await db.commit()
+    index_fingerprints(article_ids, saved_fingerprints)
+    count_saved(saved_rows)
+    return saved_rows
+
+
+def count_saved(rows: List[dict]):
+    for source, count in Counter(row["source"] for row in rows).items():
+        ARTICLES_SAVED.labels(source).inc(count)
+
+
+async def existing_urls(db: AsyncSession, urls: List[str]) -> set:
+    """Return the subset of ``urls`` already present in NewsArticle"""
+    found = set()
+    for start in range(0, len(urls), URL_LOOKUP_CHUNK_SIZE):
+        chunk = urls[start:start + URL_LOOKUP_CHUNK_SIZE]
+        found.update(
+            (await db.execute(select(NewsArticle.url).where(NewsArticle.url.in_(chunk)))).scalars()
+        )
+    return found
+
+
+def build_article_row(article: Article) -> Optional[dict]:
+    """
+    Validate a scraped article and map it to NewsArticle column values.
+    Dates are stored as naive UTC to match the DateTime columns.
+    """
+    if not article.url or not article.title:
+        logger.warning("Skipping article missing link or title: %s", article)
+        return None
 
-    db.add(new_article)
-    return True
+    return {
+        "source": article.source or "Unknown",
+        "author": article.author,
+        "title": article.title,
+        "description": article.description,
+        "url": article.url,
+        "image_url": article.image_url,
+        "published_at": to_naive_utc(article.published_at or datetime.now(timezone.utc)),
+        "content": "",
+    }
 
 @router.get("/stats")
 async def get_news_stats():
@@ -214,8 +567,100 @@ async def get_news_stats():
         "scheduler_running": scheduler.running,
         "jobs": jobs,
         "stats": NEWS_EXECUTION_STATS,
+        "cache": news_cache.stats(),
+        "page_cache": news_page_cache.stats(),
+        "retention": retention_stats(),
+        "sources": SOURCE_RESULTS,
+        "thumbnails": thumbnail_cache.stats(),
+        "uploads": UPLOAD_STATS,
+        "dedupe": fingerprint_index.stats(),
+        "dates": date_normalizer.stats(),
+        "conditional_get": CONDITIONAL_GET_STATS,
         "current_time": datetime.now().isoformat()
     }
+def encode_cursor(published_at: datetime, article_id: int) -> str:
+    raw = f"{published_at.isoformat()}|{article_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        published_at, article_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(published_at), int(article_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def serialize_article(article: NewsArticle) -> Article:
+    return Article(
+        id=article.id,
+        source=article.source,
+        author=article.author,
+        title=article.title,
+        description=article.description,
+        url=article.url,
+        image_url=article.image_url,
+        published_at=article.published_at,
+    )
+
+@router.get("/articles")
+def list_articles(
+    source: Optional[List[str]] = Query(None),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db)
+):
+    """
+    Stored articles, newest first, with keyset pagination on
+    (published_at, id). Pass the returned next_cursor to get the next page.
+    """
+    stmt = select(NewsArticle).order_by(
+        NewsArticle.published_at.desc(), NewsArticle.id.desc()
+    )
+    if source:
+        stmt = stmt.where(NewsArticle.source.in_(source))
+    if since:
+        stmt = stmt.where(NewsArticle.published_at >= since)
+    if until:
+        stmt = stmt.where(NewsArticle.published_at < until)
+    if cursor:
+        stmt = stmt.where(
+            tuple_(NewsArticle.published_at, NewsArticle.id) < tuple_(*decode_cursor(cursor))
+        )
+
+    # One extra row tells us whether there is a next page
+    rows = db.execute(stmt.limit(limit + 1)).scalars().all()
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1]
+        next_cursor = encode_cursor(last.published_at, last.id)
+
+    return ORJSONResponse({
+        "articles": [serialize_article(article) for article in page],
+        "count": len(page),
+        "next_cursor": next_cursor,
+    })
+
+@router.get("/search")
+def search_news(
+    q: Optional[str] = None,
+    source: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(SEARCH_PAGE_SIZE, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """Full-text search over stored article titles and descriptions"""
+    articles, total = search_articles(db, q=q, source=source, page=page, page_size=page_size)
+    return ORJSONResponse({
+        "articles": [serialize_article(article) for article in articles],
+        "count": len(articles),
+        "total": total,
+        "page": page,
+        "pages": (total + page_size - 1) // page_size,
+    })
+
 # def setup_scheduler(app: FastAPI):
 #     # Attach the lifespan to the app
 #     app.lifespan = lifespan
@@ -230,26 +675,39 @@ async def get_news_stats():
 
 
 
-def run_scraping_task(clean_first: bool, days_to_keep: int = 7):
-    """Run scraping logic synchronously within a background task"""
-    try:
-        with SessionLocal() as db:
-            if clean_first:
-                clean_old_articles(db, days=days_to_keep)
-            asyncio.run(fetch_and_store_news(db))
-            logger.info("Scraping completed successfully")
-    except Exception as e:
-        logger.error(f"Background scraping failed: {str(e)}", exc_info=True)
-
 @router.post("/trigger-scraping")
 async def trigger_scraping(
-    background_tasks: BackgroundTasks,
     clean_first: bool = True,
-    days_to_keep: Optional[int] = 7
+    days_to_keep: int = Query(RETENTION_DAYS, ge=1)
 ):
-    """Trigger news scraping in the background (non-blocking)"""
-    background_tasks.add_task(run_scraping_task, clean_first, days_to_keep)
+    """
+    Start an ingestion job (non-blocking), or join the one already queued or
+    running in any worker. Poll the returned status_url for progress and
+    the result.
+    """
+    running = await job_runner.active_elsewhere(NEWS_JOB_LOCK)
+    if running is not None:
+        status, job_id, coalesced = running["status"], running["id"], True
+    else:
+        job = job_runner.submit(
+            NEWS_JOB_LOCK, run_news_job, clean_first, days_to_keep, trigger="manual"
+        )
+        status, job_id, coalesced = job.status, job.id, job.coalesced > 0
     return {
-        "status": "started",
-        "message": "Scraping is running in the background. Check logs or DB for updates."
+        "status": status,
+        "job_id": job_id,
+        "coalesced": coalesced,
+        "status_url": router.url_path_for("get_job", job_id=job_id),
     }
+
+@router.get("/jobs")
+async def list_jobs(limit: int = Query(20, ge=1, le=100)):
+    """Recent jobs of every worker, newest first"""
+    return {"jobs": await job_runner.history(limit)}
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await job_runner.lookup(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -0,0 +1,123 @@
+"""Server-side search over stored articles.
+
+Postgres uses the ``ix_newsarticle_search`` GIN index over
+``to_tsvector(title || description)``. SQLite (the default
+``sqlite:///./test.db``) gets an external-content FTS5 table kept in sync by
+triggers. Other databases fall back to a case-insensitive LIKE.
+
+Both are created by ``python -m app.database.migrate``; until then search
+falls back to LIKE too.
+"""
+import logging
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, literal_column, or_, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .models import NewsArticle, news_search_vector
+
+logger = logging.getLogger(__name__)
+
+SEARCH_PAGE_SIZE = 30
+FTS_TABLE = "aipc_diagnosis_newsarticle_fts"
+
+_SQLITE_FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description,
+        content='aipc_diagnosis_newsarticle', content_rowid='id'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON aipc_diagnosis_newsarticle BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON aipc_diagnosis_newsarticle BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON aipc_diagnosis_newsarticle BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+]
+
+# Database URLs whose FTS5 table is known to exist
+_fts_available = set()
+
+
+def init_search_index(engine: Engine):
+    """Create the SQLite FTS5 table and triggers (Postgres uses the model index)"""
+    if engine.dialect.name != "sqlite":
+        return
+    try:
+        with engine.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": FTS_TABLE}
+            ).first()
+            for statement in _SQLITE_FTS_DDL:
+                conn.execute(text(statement))
+            if not exists:
+                # Index the rows stored before the FTS table existed
+                conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        _fts_available.add(engine.url)
+    except Exception as e:
+        logger.warning("SQLite FTS5 unavailable, search falls back to LIKE: %s", e)
+
+
+def _fts_ready(db: Session) -> bool:
+    """Whether the migration has created the FTS5 table; re-checked until it has"""
+    url = db.get_bind().url
+    if url not in _fts_available and db.execute(
+        text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": FTS_TABLE}
+    ).first():
+        _fts_available.add(url)
+    return url in _fts_available
+
+
+def _fts5_query(q: str) -> str:
+    """Quote each term so user input can't use FTS5 query syntax; terms are ANDed"""
+    terms = re.findall(r"\w+", q)
+    return " ".join('"%s"*' % term for term in terms)
+
+
+def _apply_query(stmt, db: Session, q: str):
+    bind = db.get_bind()
+    dialect = bind.dialect.name
+    if dialect == "postgresql":
+        query = func.websearch_to_tsquery(literal_column("'english'::regconfig"), q)
+        return stmt.where(news_search_vector().op("@@")(query))
+    if dialect == "sqlite" and _fts_ready(db):
+        match = _fts5_query(q)
+        if not match:
+            return stmt.where(False)
+        rowids = text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match").bindparams(match=match)
+        return stmt.where(NewsArticle.id.in_(rowids.columns(rowid=NewsArticle.id.type)))
+    pattern = f"%{q}%"
+    return stmt.where(or_(NewsArticle.title.ilike(pattern), NewsArticle.description.ilike(pattern)))
+
+
+def search_articles(
+    db: Session,
+    q: Optional[str] = None,
+    source: Optional[str] = None,
+    page: int = 1,
+    page_size: int = SEARCH_PAGE_SIZE,
+) -> Tuple[List[NewsArticle], int]:
+    """
+    One page of stored articles matching ``q`` and ``source``, newest first,
+    plus the total number of matches.
+    """
+    stmt = select(NewsArticle)
+    if source:
+        stmt = stmt.where(NewsArticle.source == source)
+    if q and q.strip():
+        stmt = _apply_query(stmt, db, q.strip())
+
+    total = db.execute(select(func.count()).select_from(stmt.subquery())).scalar_one()
+    rows = db.execute(
+        stmt.order_by(NewsArticle.published_at.desc(), NewsArticle.id.desc())
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+    ).scalars().all()
+    return rows, total
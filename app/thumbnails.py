@@ -0,0 +1,287 @@
+"""Resized, locally cached thumbnails for article images.
+
+``/img`` serves an article image as a WebP or JPEG thumbnail at one of
+``THUMB_WIDTHS``. The original is fetched once, and every width and format
+is produced from that one decode in the parse pool. The results go into
+an on-disk cache in ``THUMB_CACHE_DIR``. The cache is an LRU by file
+mtime, bounded by ``THUMB_CACHE_MAX_BYTES``. An image that could not be
+fetched or decoded is not retried for ``THUMB_FAILURE_TTL`` seconds.
+
+URLs are signed with SECRET_KEY, so the endpoint only proxies images that
+the app itself linked to.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import io
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from decouple import config
+
+from .fetcher import fetch
+from .parse_pool import run_parse
+
+logger = logging.getLogger(__name__)
+
+THUMB_CACHE_DIR = config('THUMB_CACHE_DIR', default=os.path.join(tempfile.gettempdir(), "news-thumbnails"))
+THUMB_CACHE_MAX_BYTES = config('THUMB_CACHE_MAX_BYTES', default=256 * 1024 * 1024, cast=int)
+THUMB_MAX_SOURCE_BYTES = config('THUMB_MAX_SOURCE_BYTES', default=15 * 1024 * 1024, cast=int)
+THUMB_WIDTHS = (320, 640)
+THUMB_FORMATS = {"webp": "image/webp", "jpeg": "image/jpeg"}
+THUMB_QUALITY = 80
+# Thumbnails never change for a given URL, width and format
+THUMB_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# At most this many images are fetched and resized at once when pre-warming
+THUMB_PREWARM_CONCURRENCY = 4
+THUMB_PREWARM = config('THUMB_PREWARM', default=True, cast=bool)
+# A background pre-warm is abandoned after this many seconds
+THUMB_PREWARM_TIMEOUT = config('THUMB_PREWARM_TIMEOUT', default=120, cast=float)
+# Failed images are remembered (up to THUMB_FAILURE_MAX of them) and not
+# fetched again for this many seconds
+THUMB_FAILURE_TTL = config('THUMB_FAILURE_TTL', default=300, cast=float)
+THUMB_FAILURE_MAX = 10000
+
+_SECRET = config('SECRET_KEY').encode()
+
+
+# ---------- Signed URLs ----------
+
+def _signature(url: str) -> str:
+    return hmac.new(_SECRET, url.encode(), hashlib.sha256).hexdigest()[:16]
+
+
+def thumbnail_url(url: Optional[str], width: int = THUMB_WIDTHS[0]) -> Optional[str]:
+    """Path of the ``/img`` thumbnail for ``url``; None passes through"""
+    if not url or not url.startswith(("http://", "https://")):
+        return url
+    encoded = base64.urlsafe_b64encode(url.encode()).decode().rstrip("=")
+    return f"/img?u={encoded}&w={width}&s={_signature(url)}"
+
+
+def decode_thumbnail_request(encoded: str, signature: str) -> Optional[str]:
+    """Original image URL for a signed ``/img`` request, or None if invalid"""
+    try:
+        url = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4)).decode()
+    except ValueError:
+        return None
+    if not hmac.compare_digest(_signature(url), signature):
+        return None
+    return url
+
+
+# ---------- Resizing (runs in the parse pool) ----------
+
+def make_thumbnails(data: bytes, widths: Tuple[int, ...]) -> Dict[Tuple[int, str], bytes]:
+    """Decode ``data`` once and encode every (width, format) thumbnail"""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        # Lets JPEG decode at a reduced scale that is still >= the largest width
+        image.draft("RGB", (max(widths), max(widths)))
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+        thumbnails = {}
+        for width in widths:
+            resized = image
+            if image.width > width:
+                height = max(1, round(image.height * width / image.width))
+                resized = image.resize((width, height), Image.Resampling.LANCZOS)
+            for fmt in THUMB_FORMATS:
+                out = io.BytesIO()
+                if fmt == "jpeg":
+                    flat = resized.convert("RGB") if resized.mode != "RGB" else resized
+                    flat.save(out, "JPEG", quality=THUMB_QUALITY, optimize=True, progressive=True)
+                else:
+                    resized.save(out, "WEBP", quality=THUMB_QUALITY, method=4)
+                thumbnails[(width, fmt)] = out.getvalue()
+        return thumbnails
+
+
+# ---------- On-disk LRU ----------
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as handle:
+        return handle.read()
+
+
+class ThumbnailUnavailable(Exception):
+    """The image failed recently and is not retried until THUMB_FAILURE_TTL passes"""
+
+
+class ThumbnailCache:
+    def __init__(self, directory: str = THUMB_CACHE_DIR, max_bytes: int = THUMB_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # url -> monotonic time until which it is not retried, oldest first
+        self._failures: Dict[str, float] = {}
+        self.counters = {"hits": 0, "misses": 0, "errors": 0, "negative_hits": 0, "evictions": 0}
+
+    def path(self, url: str, width: int, fmt: str) -> str:
+        digest = hashlib.sha256(url.encode()).hexdigest()
+        return os.path.join(self.directory, digest[:2], f"{digest}-{width}.{fmt}")
+
+    def lookup(self, url: str, width: int, fmt: str) -> Optional[str]:
+        path = self.path(url, width, fmt)
+        try:
+            # Reads refresh the mtime, which is what eviction orders by
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    async def get(self, url: str, width: int, fmt: str) -> bytes:
+        """The thumbnail's bytes, fetching and resizing on a miss"""
+        path = self.lookup(url, width, fmt)
+        if path is not None:
+            self.counters["hits"] += 1
+        else:
+            self.counters["misses"] += 1
+            await self.ensure(url)
+            path = self.path(url, width, fmt)
+        # Read rather than stream the file, which eviction may remove meanwhile
+        return await asyncio.to_thread(_read_file, path)
+
+    async def ensure(self, url: str):
+        """Fetch and resize ``url`` unless it is cached; concurrent calls share one fetch"""
+        if all(self.lookup(url, width, fmt) for width in THUMB_WIDTHS for fmt in THUMB_FORMATS):
+            return
+        retry_at = self._failures.get(url)
+        if retry_at is not None:
+            if time.monotonic() < retry_at:
+                self.counters["negative_hits"] += 1
+                raise ThumbnailUnavailable(url)
+            del self._failures[url]
+        task = self._inflight.get(url)
+        if task is None:
+            task = self._inflight[url] = asyncio.create_task(self._build(url))
+            task.add_done_callback(lambda _: self._inflight.pop(url, None))
+        await asyncio.shield(task)
+
+    async def _build(self, url: str):
+        try:
+            response = await fetch(url)
+            if len(response.content) > THUMB_MAX_SOURCE_BYTES:
+                raise ValueError(f"image is larger than {THUMB_MAX_SOURCE_BYTES} bytes")
+            thumbnails = await run_parse(make_thumbnails, response.content, THUMB_WIDTHS)
+        except Exception:
+            self.counters["errors"] += 1
+            self._remember_failure(url)
+            raise
+        await asyncio.to_thread(self._store, url, thumbnails)
+
+    def _remember_failure(self, url: str):
+        self._failures.pop(url, None)
+        self._failures[url] = time.monotonic() + THUMB_FAILURE_TTL
+        while len(self._failures) > THUMB_FAILURE_MAX:
+            del self._failures[next(iter(self._failures))]
+
+    def _store(self, url: str, thumbnails: Dict[Tuple[int, str], bytes]):
+        written = 0
+        for (width, fmt), data in thumbnails.items():
+            path = self.path(url, width, fmt)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as handle:
+                handle.write(data)
+            os.replace(tmp, path)
+            written += len(data)
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += written
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _files(self):
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime, stat.st_size, path
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._files())
+
+    def _evict(self):
+        """Delete least recently used files until the cache is at 90% of its bound"""
+        target = self.max_bytes * 0.9
+        files = sorted(self._files())
+        size = sum(entry[1] for entry in files)
+        for _, file_size, path in files:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= file_size
+            self.counters["evictions"] += 1
+        self._size = size
+
+    def stats(self) -> dict:
+        return {
+            **self.counters, "failures": len(self._failures),
+            "bytes": self._size, "max_bytes": self.max_bytes,
+        }
+
+
+thumbnail_cache = ThumbnailCache()
+
+
+def preferred_format(accept: str) -> str:
+    return "webp" if "image/webp" in (accept or "") else "jpeg"
+
+
+async def prewarm_thumbnails(urls: Iterable[Optional[str]]):
+    """Build thumbnails for new article images ahead of the first page view"""
+    limit = asyncio.Semaphore(THUMB_PREWARM_CONCURRENCY)
+
+    async def warm(url):
+        async with limit:
+            try:
+                await thumbnail_cache.ensure(url)
+            except Exception as e:
+                logger.debug("Thumbnail pre-warm of %s failed: %s", url, e)
+
+    unique = {url for url in urls if url and url.startswith(("http://", "https://"))}
+    await asyncio.gather(*(warm(url) for url in unique))
+
+
+_prewarm_tasks = set()
+
+
+def _prewarm_done(task: asyncio.Task):
+    _prewarm_tasks.discard(task)
+    if not task.cancelled() and isinstance(task.exception(), asyncio.TimeoutError):
+        logger.info("Thumbnail pre-warm stopped after %gs", THUMB_PREWARM_TIMEOUT)
+
+
+def schedule_prewarm(urls: Iterable[Optional[str]]) -> asyncio.Task:
+    """Pre-warm in the background, bounded by THUMB_PREWARM_TIMEOUT"""
+    task = asyncio.create_task(asyncio.wait_for(prewarm_thumbnails(list(urls)), THUMB_PREWARM_TIMEOUT))
+    _prewarm_tasks.add(task)
+    task.add_done_callback(_prewarm_done)
+    return task
+
+
+async def stop_prewarm():
+    """Cancel the background pre-warms, e.g. on shutdown"""
+    tasks = list(_prewarm_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,143 @@
+"""Content-addressed image uploads.
+
+Each upload is hashed (SHA-256) and stored in B2 under
+``images/<hh>/<sha256><ext>``, so identical bytes always map to the same
+object. The ``aipc_diagnosis_uploadedimage`` table indexes hash -> download
+URL. A repeat upload is answered from that table without calling B2.
+"""
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import os
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+
+from decouple import config
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from .database.database import AsyncSessionLocal
+from .helper import BUCKET_NAME, upload_image_to_backblaze_async
+from .models import UploadedImage
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_KEY_PREFIX = "images"
+# Files of a batch upload sent to B2 at once
+UPLOAD_CONCURRENCY = config('UPLOAD_CONCURRENCY', default=4, cast=int)
+UPLOAD_MAX_BATCH = config('UPLOAD_MAX_BATCH', default=20, cast=int)
+_HASH_CHUNK = 1024 * 1024
+
+UPLOAD_STATS = {"uploads": 0, "deduplicated": 0, "bytes_uploaded": 0, "bytes_saved": 0}
+
+
+@dataclass
+class StoredImage:
+    image_url: str
+    sha256: str
+    size: int
+    deduplicated: bool
+
+
+def hash_upload(file: UploadFile) -> Tuple[str, int]:
+    """SHA-256 and size of the upload, read in chunks from its spooled file"""
+    digest = hashlib.sha256()
+    size = 0
+    file.file.seek(0)
+    while True:
+        chunk = file.file.read(_HASH_CHUNK)
+        if not chunk:
+            break
+        digest.update(chunk)
+        size += len(chunk)
+    file.file.seek(0)
+    return digest.hexdigest(), size
+
+
+def content_key(sha256: str, content_type: str, filename: Optional[str] = None) -> str:
+    """Object key for an image; the extension comes from its type, else its name"""
+    ext = mimetypes.guess_extension(content_type or "") or ""
+    if not ext and filename:
+        ext = os.path.splitext(filename)[1].lower()
+    return f"{UPLOAD_KEY_PREFIX}/{sha256[:2]}/{sha256}{ext}"
+
+
+async def _lookup(sha256: str, bucket_name: str) -> Optional[UploadedImage]:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(
+            select(UploadedImage).where(UploadedImage.sha256 == sha256, UploadedImage.bucket == bucket_name)
+        )
+
+
+async def _record(image: UploadedImage) -> UploadedImage:
+    async with AsyncSessionLocal() as db:
+        db.add(image)
+        try:
+            await db.commit()
+            return image
+        except IntegrityError:
+            # Another worker stored the same bytes first; its row wins
+            await db.rollback()
+    return await _lookup(image.sha256, image.bucket) or image
+
+
+class ImageStore:
+    def __init__(self, bucket_name: str = BUCKET_NAME):
+        self.bucket_name = bucket_name
+        # sha256 -> upload in progress, so concurrent copies share one transfer
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def store(self, file: UploadFile) -> StoredImage:
+        """Upload ``file`` unless identical bytes are already stored"""
+        if not file.content_type or not file.content_type.startswith('image/'):
+            raise HTTPException(status_code=400, detail="Only image files are allowed.")
+        sha256, size = await asyncio.to_thread(hash_upload, file)
+
+        existing = await _lookup(sha256, self.bucket_name)
+        if existing is None and sha256 in self._inflight:
+            existing = await asyncio.shield(self._inflight[sha256])
+        if existing is not None:
+            UPLOAD_STATS["deduplicated"] += 1
+            UPLOAD_STATS["bytes_saved"] += size
+            return StoredImage(existing.url, sha256, size, deduplicated=True)
+
+        task = self._inflight[sha256] = asyncio.create_task(self._upload(file, sha256, size))
+        task.add_done_callback(lambda _: self._inflight.pop(sha256, None))
+        image = await asyncio.shield(task)
+        return StoredImage(image.url, sha256, size, deduplicated=False)
+
+    async def _upload(self, file: UploadFile, sha256: str, size: int) -> UploadedImage:
+        key = content_key(sha256, file.content_type, file.filename)
+        url = await upload_image_to_backblaze_async(file, self.bucket_name, key)
+        UPLOAD_STATS["uploads"] += 1
+        UPLOAD_STATS["bytes_uploaded"] += size
+        return await _record(UploadedImage(
+            sha256=sha256,
+            bucket=self.bucket_name,
+            file_name=key,
+            url=url,
+            content_type=file.content_type,
+            size=size,
+            original_filename=file.filename,
+        ))
+
+    async def store_many(self, files: List[UploadFile]) -> List[dict]:
+        """Store a batch concurrently; each file gets its own result or error"""
+        limit = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+
+        async def one(file):
+            async with limit:
+                try:
+                    return {"filename": file.filename, **asdict(await self.store(file))}
+                except HTTPException as e:
+                    return {"filename": file.filename, "error": e.detail}
+                except Exception as e:
+                    logger.error("Upload of %s failed: %s", file.filename, e)
+                    return {"filename": file.filename, "error": str(e)}
+
+        return await asyncio.gather(*(one(file) for file in files))
+
+
+image_store = ImageStore()
@@ -0,0 +1,10 @@
+"""Offline benchmarks for the scraping and parsing hot paths.
+
+The app modules read their settings at import time; provide harmless
+defaults so the benchmarks run without a .env file.
+"""
+import os
+
+for _name in ("SECRET_KEY", "AWS_STORAGE_BUCKET_NAME", "AWS_ACCESS_KEY_ID",
+              "AWS_SECRET_ACCESS_KEY", "AWS_S3_REGION_NAME"):
+    os.environ.setdefault(_name, "benchmark")
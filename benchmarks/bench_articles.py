@@ -0,0 +1,101 @@
+"""Memory and serialization benchmark for the Article type.
+
+Builds a large list of articles from the saved PCWorld fixture, once in the
+previous form (plain dicts) and once as Articles. It compares their memory,
+measured with tracemalloc, and their response render time, and prints the
+results as JSON. The dicts are rendered the two ways the API used to
+render them:
+
+* ``JSONResponse`` directly, as the scrape endpoints did;
+* ``jsonable_encoder`` then ``JSONResponse``, which is what FastAPI does
+  for routes that return a dict, such as /articles and /search.
+
+Articles are rendered with ``ORJSONResponse``.
+
+    python -m benchmarks.bench_articles [--articles 20000] [--repeat 10]
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from dataclasses import replace
+from pathlib import Path
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app.extractors import extract_pcworld_articles
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def legacy_dict(article, index):
+    """An article in the ad-hoc dict shape the scrapers used to return"""
+    return {
+        "source": article.source,
+        "title": article.title,
+        "link": f"{article.url}?n={index}",
+        "image": article.image_url,
+        "excerpt": article.description,
+        "author": article.author,
+        "date": "3 hours ago",
+    }
+
+
+def measure_memory(build):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        items = build()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return items, size
+
+
+def time_render(response_class, content, repeat, encode=None):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = response_class(content=encode(content) if encode else content).body
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {"min_ms": timings[0] * 1000, "median_ms": timings[len(timings) // 2] * 1000, "bytes": len(body)}
+
+
+def run(count, repeat):
+    page = extract_pcworld_articles((FIXTURES / "pcworld_news_page.html").read_text(encoding="utf-8"))
+
+    def articles():
+        return [replace(page[i % len(page)], url=f"{page[i % len(page)].url}?n={i}") for i in range(count)]
+
+    def dicts():
+        return [legacy_dict(page[i % len(page)], i) for i in range(count)]
+
+    dict_items, dict_bytes = measure_memory(dicts)
+    article_items, article_bytes = measure_memory(articles)
+    json_render = time_render(JSONResponse, dict_items, repeat)
+    encoded_render = time_render(JSONResponse, dict_items, repeat, encode=jsonable_encoder)
+    orjson_render = time_render(ORJSONResponse, article_items, repeat)
+    return {
+        "benchmark": "articles",
+        "articles": count,
+        "memory_bytes": {"dicts": dict_bytes, "articles": article_bytes},
+        "memory_ratio": round(dict_bytes / article_bytes, 2),
+        "render": {
+            "dicts_json": json_render,
+            "dicts_jsonable_encoder_json": encoded_render,
+            "articles_orjson": orjson_render,
+        },
+        "render_speedup": round(json_render["median_ms"] / orjson_render["median_ms"], 2),
+        "render_speedup_vs_encoder": round(encoded_render["median_ms"] / orjson_render["median_ms"], 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--articles", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    print(json.dumps(run(args.articles, args.repeat), indent=2))
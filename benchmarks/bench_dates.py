@@ -0,0 +1,144 @@
+"""Regression check and benchmark for publication date normalization.
+
+The dates come from the saved fixtures: RFC 822 ``pubDate`` values from the
+feeds and relative "N hours ago" strings from the PCWorld listing. For each
+one, ``DateNormalizer`` must return what the previous try-dateutil-first
+``convert_relative_time_to_date`` returned. Relative dates are compared
+against the same ``now``. Both are then timed over a batch of those
+articles, and the results are printed as JSON. The normalizer is timed both
+with a cold memo and with a warm one, as on an ingestion run that re-reads
+strings it has seen before.
+
+    python -m benchmarks.bench_dates [--repeat 20] [--batch 500]
+"""
+import argparse
+import json
+import re
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest import mock
+
+from dateutil.parser import parse
+from dateutil.relativedelta import relativedelta
+
+from app import dates
+from app.dates import DateNormalizer
+
+FIXTURES = Path(__file__).parent / "fixtures"
+# Shapes seen on live pages besides the fixtures'; relative dates are prefix matches
+EXTRA_DATES = [
+    {"source": "PCWorld", "date": "3 hours ago \u00b7 Updated 1 hour ago"},
+    {"source": "PCWorld", "date": "12 minutes ago"},
+    {"source": "PCWorld", "date": "2 Days Ago"},
+    {"source": "PCWorld", "date": "Sep 6, 2021"},
+    {"source": "Dev.to", "date": "2021-09-06T16:45:00Z"},
+    {"source": "Dev.to", "date": "not a date"},
+]
+
+
+def reference_convert(relative_time):
+    """The implementation DateNormalizer replaced"""
+    try:
+        parsed_date = parse(relative_time)
+        if parsed_date.tzinfo is None:
+            parsed_date = parsed_date.replace(tzinfo=timezone.utc)
+        else:
+            parsed_date = parsed_date.astimezone(timezone.utc)
+        return parsed_date
+    except (ValueError, OverflowError):
+        pass
+
+    match = re.match(
+        r'(\d+)\s+(second|minute|hour|day|week|month|year)s?\s+ago',
+        relative_time.lower().strip()
+    )
+    if not match:
+        return None
+    unit_conversion = {
+        'second': 'seconds', 'minute': 'minutes', 'hour': 'hours', 'day': 'days',
+        'week': 'weeks', 'month': 'months', 'year': 'years',
+    }
+    now = datetime.now(timezone.utc)
+    return now - relativedelta(**{unit_conversion[match.group(2)]: int(match.group(1))})
+
+
+def fixture_articles():
+    articles = []
+    for path in sorted(FIXTURES.glob("rss_*.xml")):
+        for value in re.findall(r"<pubDate>([^<]+)</pubDate>", path.read_text(encoding="utf-8")):
+            articles.append({"source": "Dev.to", "date": value.strip()})
+    html = (FIXTURES / "pcworld_news_page.html").read_text(encoding="utf-8")
+    for value in re.findall(r'item-date">([^<]+)<', html):
+        articles.append({"source": "PCWorld", "date": value.strip()})
+    return articles + EXTRA_DATES
+
+
+def normalize_articles(normalizer, articles, now=None):
+    """Normalize a mixed batch one source at a time, as the scrapers do"""
+    now = now or datetime.now(timezone.utc)
+    by_source = {}
+    for position, article in enumerate(articles):
+        by_source.setdefault(article["source"], []).append(position)
+    results = [None] * len(articles)
+    for source, positions in by_source.items():
+        values = normalizer.normalize_many([articles[i]["date"] for i in positions], source, now)
+        for position, value in zip(positions, values):
+            results[position] = value
+    return results
+
+
+def check(articles):
+    now = datetime.now(timezone.utc)
+    normalizer = DateNormalizer()
+    with mock.patch(f"{__name__}.datetime") as frozen:
+        frozen.now.return_value = now
+        expected = [reference_convert(article["date"]) for article in articles]
+    actual = normalize_articles(normalizer, articles, now=now)
+    for article, want, got in zip(articles, expected, actual):
+        if want != got:
+            raise SystemExit(f"{article['source']} date {article['date']!r}: {got} != baseline {want}")
+
+
+def time_batch(func, batch, repeat, setup=None):
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        func(batch)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {"min_ms": timings[0] * 1000, "median_ms": timings[len(timings) // 2] * 1000}
+
+
+def run(repeat, batch_size):
+    articles = fixture_articles()
+    check(articles)
+    batch = (articles * (batch_size // len(articles) + 1))[:batch_size]
+
+    baseline = time_batch(lambda items: [reference_convert(a["date"]) for a in items], batch, repeat)
+    cold = time_batch(lambda items: normalize_articles(DateNormalizer(), items), batch, repeat,
+                      setup=dates._parse.cache_clear)
+    normalizer = DateNormalizer()
+    normalize_articles(normalizer, batch)
+    warm = time_batch(lambda items: normalize_articles(normalizer, items), batch, repeat)
+    return {
+        "benchmark": "dates",
+        "repeat": repeat,
+        "batch": batch_size,
+        "distinct_strings": len({a["date"] for a in articles}),
+        "try_dateutil_first": baseline,
+        "normalizer_cold": cold,
+        "normalizer_warm": warm,
+        "speedup_cold": round(baseline["median_ms"] / cold["median_ms"], 2),
+        "speedup_warm": round(baseline["median_ms"] / warm["median_ms"], 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+    print(json.dumps(run(args.repeat, args.batch), indent=2))
@@ -0,0 +1,105 @@
+"""Parse-time micro-benchmark for the PCWorld listing extractor.
+
+Compares the lxml extractor with the previous BeautifulSoup parsing loop on
+the saved listing fixtures, checks both return identical articles (the
+baseline's dicts mapped onto Article, with dates normalized against the
+same ``now``), and prints the timings as JSON.
+
+    python -m benchmarks.bench_pcworld_parse [--repeat 200]
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from app.articles import Article
+from app.dates import date_normalizer
+from app.extractors import extract_pcworld_articles
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def reference_parse(html):
+    """The BeautifulSoup loop the extractor replaced, kept as the baseline"""
+    all_articles = []
+    soup = BeautifulSoup(html, 'lxml')
+
+    articles_section = soup.find("div", class_="articleFeed-inner")
+    if not articles_section:
+        return all_articles
+
+    for article in articles_section.find_all("article", class_="item"):
+        title = article.find("h3").get_text(strip=True) if article.find("h3") else None
+        link = article.find("a", href=True)["href"] if article.find("a", href=True) else None
+        image = article.find("img")["src"] if article.find("img") else None
+        excerpt = article.find("span", class_="item-excerpt").get_text(strip=True) if article.find("span", class_="item-excerpt") else None
+
+        meta = article.find("div", class_="item-meta")
+        author = meta.find("span", class_="item-byline").get_text(strip=True) if meta and meta.find("span", class_="item-byline") else None
+        date = meta.find("span", class_="item-date").get_text(strip=True) if meta and meta.find("span", class_="item-date") else None
+
+        all_articles.append({
+            "source": "PCWorld",
+            "title": title,
+            "link": link,
+            "image": image,
+            "excerpt": excerpt,
+            "author": author,
+            "date": date,
+        })
+    return all_articles
+
+
+def as_article(article, now):
+    return Article(
+        source=article["source"],
+        title=article["title"],
+        url=article["link"],
+        image_url=article["image"],
+        description=article["excerpt"],
+        author=article["author"],
+        published_at=date_normalizer.normalize(article["date"], article["source"], now),
+    )
+
+
+def best_of(func, arg, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(arg)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {"min_ms": timings[0] * 1000, "median_ms": timings[len(timings) // 2] * 1000}
+
+
+def run(repeat):
+    results = []
+    for path in sorted(FIXTURES.glob("pcworld_*.html")):
+        html = path.read_text(encoding="utf-8")
+        now = datetime.now(timezone.utc)
+        expected = [as_article(article, now) for article in reference_parse(html)]
+        actual = extract_pcworld_articles(html, now=now)
+        if actual != expected:
+            raise SystemExit(f"{path.name}: extractor output differs from the BeautifulSoup baseline")
+
+        baseline = best_of(reference_parse, html, repeat)
+        extractor = best_of(extract_pcworld_articles, html, repeat)
+        results.append({
+            "fixture": path.name,
+            "articles": len(actual),
+            "bytes": len(html.encode("utf-8")),
+            "beautifulsoup": baseline,
+            "lxml_extractor": extractor,
+            "speedup": round(baseline["median_ms"] / extractor["median_ms"], 2),
+        })
+    return {"benchmark": "pcworld_parse", "repeat": repeat, "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(run(args.repeat), indent=2))
@@ -0,0 +1,109 @@
+"""Regression check and benchmark for RSS entry image/excerpt extraction.
+
+For every entry in the saved feed fixtures, the single-pass
+``extract_entry_media`` must return exactly what the previous
+BeautifulSoup-based ``extract_image``/``clean_excerpt`` returned. Both are
+then timed over the whole feed and the results printed as JSON.
+
+    python -m benchmarks.bench_rss_entry [--repeat 20]
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import feedparser
+from bs4 import BeautifulSoup
+from bs4.element import Tag
+
+from app.helper import extract_entry_media
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def reference_extract_image(entry):
+    """The BeautifulSoup implementation extract_entry_media replaced"""
+    media = entry.get('media_content')
+    if isinstance(media, list):
+        for item in media:
+            url = item.get('url')
+            if url:
+                return url
+
+    enclosures = entry.get('enclosures')
+    if isinstance(enclosures, list):
+        for enclosure in enclosures:
+            url = enclosure.get('url')
+            if url:
+                return url
+
+    summary = entry.get('summary', '')
+    if summary:
+        soup = BeautifulSoup(summary, 'html.parser')
+        img_tag = soup.find('img')
+        if isinstance(img_tag, Tag):
+            src = img_tag.get('src')
+            if src:
+                return src
+
+    content = entry.get('content')
+    if isinstance(content, list):
+        for item in content:
+            value = item.get('value', '')
+            if value:
+                soup = BeautifulSoup(value, 'html.parser')
+                img_tag = soup.find('img')
+                if isinstance(img_tag, Tag):
+                    src = img_tag.get('src')
+                    if src:
+                        return src
+
+    return None
+
+
+def reference_clean_excerpt(html, limit=500):
+    soup = BeautifulSoup(html, 'html.parser')
+    text = soup.get_text(separator=' ', strip=True)
+    return text[:limit]
+
+
+def reference_media(entry):
+    return reference_extract_image(entry), reference_clean_excerpt(entry.get("summary", ""))
+
+
+def time_entries(func, entries, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for entry in entries:
+            func(entry)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {"min_ms": timings[0] * 1000, "median_ms": timings[len(timings) // 2] * 1000}
+
+
+def run(repeat):
+    results = []
+    for path in sorted(FIXTURES.glob("rss_*.xml")):
+        entries = feedparser.parse(path.read_bytes()).entries
+        for index, entry in enumerate(entries):
+            if extract_entry_media(entry) != reference_media(entry):
+                raise SystemExit(f"{path.name} entry {index}: output differs from the BeautifulSoup baseline")
+
+        baseline = time_entries(reference_media, entries, repeat)
+        single_pass = time_entries(extract_entry_media, entries, repeat)
+        results.append({
+            "fixture": path.name,
+            "entries": len(entries),
+            "beautifulsoup": baseline,
+            "single_pass": single_pass,
+            "speedup": round(baseline["median_ms"] / single_pass["median_ms"], 2),
+        })
+    return {"benchmark": "rss_entry_media", "repeat": repeat, "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(run(args.repeat), indent=2))
@@ -0,0 +1,242 @@
+"""Offline end-to-end benchmark suite.
+
+Every scenario runs against the local mock upstream (benchmarks.upstream)
+and a throwaway SQLite database, so runs are reproducible and never touch
+pcworld.com or the live feeds:
+
+* parse: parse-only timings for the recorded PCWorld page and RSS feed
+* cold_ingest: fetch_and_store_news into an empty database
+* warm_ingest: a second run on the same database, served 304s and
+  stopped by the per-source checkpoints
+* scrape_all_load: /scrape-all-news/ under concurrent requests, once with
+  the news cache bypassed and once warm
+* dedupe: fingerprinting and near-duplicate lookups against an index of
+  --index-size stored articles
+
+Results are printed (or written with --output) as JSON, tagged with the
+current git commit so runs can be compared.
+
+    python -m benchmarks.bench_suite [--scenario cold_ingest ...]
+        [--latency-ms 50] [--failure-rate 0.05] [--concurrency 20]
+        [--requests 200] [--index-size 50000] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from .upstream import FIXTURES, MockUpstream, route_fetcher_to
+
+SCENARIOS = ("parse", "cold_ingest", "warm_ingest", "scrape_all_load", "dedupe")
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=Path(__file__).parent, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    if not samples:
+        return {}
+
+    def pick(q):
+        return round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 3)
+
+    return {"min_ms": pick(0), "p50_ms": pick(0.5), "p95_ms": pick(0.95), "max_ms": pick(1)}
+
+
+def bench_parse(repeat):
+    from app.extractors import extract_pcworld_articles
+    from app.helper import parse_feed_document
+
+    html = (FIXTURES / "pcworld_news_page.html").read_bytes()
+    feed = (FIXTURES / "rss_devto.xml").read_bytes()
+    headers = {"content-type": "application/rss+xml", "content-location": "https://dev.to/feed"}
+    cases = {
+        "pcworld_listing": lambda: extract_pcworld_articles(html),
+        "rss_feed": lambda: parse_feed_document("Dev.to", feed, headers),
+    }
+    results = {}
+    for name, func in cases.items():
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        results[name] = _percentiles(timings)
+    return results
+
+
+def bench_dedupe(index_size, repeat):
+    import random
+    from datetime import datetime
+    from app.dedupe import FingerprintIndex, article_simhash, canonicalize_url
+
+    rnd = random.Random(0)
+    words = [f"word{i}" for i in range(5000)]
+    index = FingerprintIndex()
+    published_at = datetime.now()
+    for article_id in range(1, index_size + 1):
+        index.add(article_id, f"https://example.com/{article_id}", rnd.getrandbits(64), published_at)
+
+    texts = [(" ".join(rnd.choices(words, k=8)), " ".join(rnd.choices(words, k=40))) for _ in range(repeat)]
+    urls = [f"https://www.example.com/story/{i}/amp/?utm_source=rss&id={i}" for i in range(repeat)]
+    fingerprint, lookup = [], []
+    for (title, excerpt), url in zip(texts, urls):
+        started = time.perf_counter()
+        canonical, value = canonicalize_url(url), article_simhash(title, excerpt)
+        fingerprint.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        index.match(canonical, value)
+        lookup.append(time.perf_counter() - started)
+    return {"index_size": index_size, "fingerprint": _percentiles(fingerprint), "lookup": _percentiles(lookup)}
+
+
+async def _ingest_once(upstream):
+    from app.routers.news_scheduler import fetch_and_store_news
+    from app.database.database import AsyncSessionLocal
+
+    upstream.reset_counters()
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        result = await fetch_and_store_news(db)
+    return {
+        "seconds": round(time.perf_counter() - started, 4),
+        "fetched": result["fetched"],
+        "saved": result["saved"],
+        "failed_sources": result["failed_sources"],
+        "upstream": upstream.counters(),
+        "sources": result["sources"],
+    }
+
+
+async def _scrape_all_load(upstream, concurrency, total, use_cache):
+    import httpx
+    from app.cache import news_cache
+    from app.main import app
+
+    ttl, stale_ttl = news_cache.ttl, news_cache.stale_ttl
+    if not use_cache:
+        news_cache.ttl = news_cache.stale_ttl = 0
+    upstream.reset_counters()
+    latencies, errors = [], 0
+    remaining = iter(range(total))
+
+    async def worker(client):
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.get("/scrape-all-news/")
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            if use_cache:
+                await client.get("/scrape-all-news/")  # warm the cache
+                upstream.reset_counters()
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+    finally:
+        news_cache.ttl, news_cache.stale_ttl = ttl, stale_ttl
+
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "requests_per_second": round(total / elapsed, 1),
+        "latency": _percentiles(latencies),
+        "upstream": upstream.counters(),
+    }
+
+
+async def run_async(args, upstream):
+    from app import fetcher, parse_pool
+    from app.database.database import async_engine
+    from app.database.migrate import migrate
+
+    migrate()
+    results = {}
+    try:
+        if "cold_ingest" in args.scenario or "warm_ingest" in args.scenario:
+            cold = await _ingest_once(upstream)
+            if "cold_ingest" in args.scenario:
+                results["cold_ingest"] = cold
+            if "warm_ingest" in args.scenario:
+                results["warm_ingest"] = await _ingest_once(upstream)
+        if "scrape_all_load" in args.scenario:
+            results["scrape_all_load"] = {
+                "uncached": await _scrape_all_load(upstream, args.concurrency, args.requests, use_cache=False),
+                "cached": await _scrape_all_load(upstream, args.concurrency, args.requests, use_cache=True),
+            }
+    finally:
+        await fetcher.aclose()
+        parse_pool.shutdown()
+        await async_engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay added to every upstream response")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of upstream requests answered 503")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=50, help="iterations for the parse and dedupe scenarios")
+    parser.add_argument("--index-size", type=int, default=50000, help="stored articles for the dedupe scenario")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="news-bench-")
+    # The app builds its engines at import time, so point them at a scratch DB first
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ.setdefault("JOB_LOCK_DIR", workdir)
+    # The mock upstream serves no images; background thumbnail warms would only retry
+    os.environ.setdefault("THUMB_PREWARM", "false")
+
+    report = {
+        "benchmark": "suite",
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "settings": {
+            "latency_ms": args.latency_ms,
+            "failure_rate": args.failure_rate,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+        },
+        "results": {},
+    }
+    if "parse" in args.scenario:
+        report["results"]["parse"] = bench_parse(args.repeat)
+    if "dedupe" in args.scenario:
+        report["results"]["dedupe"] = bench_dedupe(args.index_size, args.repeat)
+
+    with MockUpstream(latency=args.latency_ms / 1000, failure_rate=args.failure_rate) as upstream:
+        route_fetcher_to(upstream)
+        report["results"].update(asyncio.run(run_async(args, upstream)))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Local stand-in for the upstream sites, serving the recorded fixtures.
+
+``MockUpstream`` runs a threaded HTTP server on 127.0.0.1. Requests reach it
+through ``RewriteTransport``, which maps ``https://<host>/<path>`` onto
+``http://127.0.0.1:<port>/<host>/<path>``. The app's URLs therefore stay
+unchanged, and only the network hop is local.
+
+* PCWorld listing pages serve ``pcworld_news_page.html`` with the article
+  links and titles made unique per page.
+* Every RSS feed serves ``rss_devto.xml`` with links, titles and excerpts
+  made unique per host.
+* Each response carries a strong ETag, and ``If-None-Match`` gets a 304, so
+  warm runs exercise the conditional path.
+* ``latency`` adds a delay (seconds) to every response. ``failure_rate`` is
+  the share of requests answered with a 503.
+"""
+import hashlib
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+_PCWORLD_PAGE = re.compile(r"/page/(\d+)/?$")
+_PCWORLD_TITLE = re.compile(r'<h3 class="item-title">')
+_RSS_TITLE = re.compile(r"<item>\s*<title>")
+_RSS_DESCRIPTION = re.compile(r"(?<=</guid>)\s*<description>")
+# Words prefixed to each served title (and feed excerpt). A page or host
+# number alone would leave the copies within near-duplicate distance of
+# each other, and the dedupe stage would drop them.
+_TITLE_WORDS = (
+    "amber", "basalt", "cobalt", "delta", "ember", "fjord", "garnet", "harbor",
+    "indigo", "jasper", "krypton", "lagoon", "magnet", "nebula", "onyx", "prism",
+    "quartz", "raven", "sierra", "tundra", "umbra", "vertex", "willow", "xenon",
+    "yonder", "zephyr", "aurora", "breeze", "canyon", "dune", "echo", "flint",
+)
+
+
+def distinct_words(key: str, count: int = 8) -> str:
+    digest = hashlib.sha1(key.encode()).digest()
+    return " ".join(_TITLE_WORDS[byte % len(_TITLE_WORDS)] for byte in digest[:count])
+
+
+def _prefix_titles(body: str, pattern: re.Pattern, key: str) -> str:
+    """Prefix the n-th text matched by ``pattern`` with words unique to ``key`` and n"""
+    counter = iter(range(len(body)))
+    return pattern.sub(lambda m: f"{m.group(0)}{distinct_words(f'{key}/{next(counter)}')} ", body)
+
+
+class MockUpstream:
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.requests = 0
+        self.not_modified = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._pcworld = (FIXTURES / "pcworld_news_page.html").read_text(encoding="utf-8")
+        self._rss = (FIXTURES / "rss_devto.xml").read_text(encoding="utf-8")
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def counters(self) -> dict:
+        return {"requests": self.requests, "not_modified": self.not_modified, "failures": self.failures}
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = self.not_modified = self.failures = 0
+
+    def body_for(self, host: str, path: str):
+        """Fixture body and content type served for an upstream URL"""
+        if host.endswith("pcworld.com"):
+            match = _PCWORLD_PAGE.search(path)
+            page = match.group(1) if match else "1"
+            body = self._pcworld.replace("/article/24", f"/article/{page}-24")
+            return _prefix_titles(body, _PCWORLD_TITLE, f"{host}/{page}"), "text/html; charset=utf-8"
+        body = self._rss.replace("https://dev.to/author", f"https://{host}/author")
+        body = _prefix_titles(body, _RSS_TITLE, host)
+        return _prefix_titles(body, _RSS_DESCRIPTION, f"{host}/excerpt"), "application/rss+xml"
+
+    def _handler_class(self):
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                host, _, path = self.path.lstrip("/").partition("/")
+                with upstream._lock:
+                    upstream.requests += 1
+                    fail = upstream._random.random() < upstream.failure_rate
+                if upstream.latency:
+                    time.sleep(upstream.latency)
+                if fail:
+                    with upstream._lock:
+                        upstream.failures += 1
+                    return self._send(503, b"", "text/plain")
+
+                body, content_type = upstream.body_for(host, "/" + path)
+                raw = body.encode("utf-8")
+                etag = '"%s"' % hashlib.sha1(raw).hexdigest()
+                if self.headers.get("If-None-Match") == etag:
+                    with upstream._lock:
+                        upstream.not_modified += 1
+                    return self._send(304, b"", content_type, {"ETag": etag})
+                self._send(200, raw, content_type, {"ETag": etag})
+
+            def _send(self, status, body, content_type, headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+class RewriteTransport(httpx.AsyncBaseTransport):
+    """Sends every request to the mock upstream, keeping host and path in the URL"""
+
+    def __init__(self, port: int, limits: httpx.Limits):
+        self._port = port
+        self._transport = httpx.AsyncHTTPTransport(limits=limits)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        url = request.url
+        target = f"http://127.0.0.1:{self._port}/{url.host}{url.raw_path.decode('ascii')}"
+        request.url = httpx.URL(target)
+        request.headers["Host"] = f"127.0.0.1:{self._port}"
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def route_fetcher_to(upstream: MockUpstream):
+    """Make the app's shared HTTP clients talk to ``upstream``"""
+    from app import fetcher
+
+    def init(state):
+        limits = httpx.Limits(
+            max_connections=fetcher.FETCH_MAX_CONNECTIONS,
+            max_keepalive_connections=fetcher.FETCH_MAX_CONNECTIONS,
+        )
+        state.client = httpx.AsyncClient(
+            transport=RewriteTransport(upstream.port, limits),
+            timeout=httpx.Timeout(fetcher.FETCH_TIMEOUT, connect=fetcher.FETCH_CONNECT_TIMEOUT),
+            headers={"User-Agent": fetcher.FETCH_USER_AGENT},
+            follow_redirects=True,
+        )
+        state.host_limits = {}
+
+    fetcher._LoopState.__init__ = init
@@ -0,0 +1,20 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Settings the app reads at import time; tests never reach B2 or a real database
+_scratch = tempfile.mkdtemp(prefix="news-tests-")
+for name, value in {
+    "SECRET_KEY": "test-secret",
+    "AWS_STORAGE_BUCKET_NAME": "test-bucket",
+    "AWS_ACCESS_KEY_ID": "test",
+    "AWS_SECRET_ACCESS_KEY": "test",
+    "AWS_S3_REGION_NAME": "test",
+    "DATABASE_URL": f"sqlite:///{_scratch}/test.db",
+    "JOB_LOCK_DIR": _scratch,
+    "THUMB_CACHE_DIR": os.path.join(_scratch, "thumbnails"),
+}.items():
+    os.environ.setdefault(name, value)
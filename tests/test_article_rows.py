@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta, timezone
+
+from app.articles import Article
+from app.dates import to_naive_utc
+from app.dedupe import fingerprint_row
+from app.routers.news_scheduler import build_article_row
+
+
+def test_to_naive_utc_converts_aware_values():
+    value = datetime(2021, 9, 6, 18, 45, tzinfo=timezone(timedelta(hours=2)))
+    assert to_naive_utc(value) == datetime(2021, 9, 6, 16, 45)
+    assert to_naive_utc(value).tzinfo is None
+
+
+def test_to_naive_utc_keeps_naive_values():
+    value = datetime(2021, 9, 6, 16, 45)
+    assert to_naive_utc(value) is value
+
+
+def test_build_article_row_stores_naive_utc():
+    published = datetime(2021, 9, 6, 12, 45, tzinfo=timezone(timedelta(hours=-4)))
+    row = build_article_row(Article(title="Title", url="https://example.com/a", published_at=published))
+    assert row["published_at"] == datetime(2021, 9, 6, 16, 45)
+    assert fingerprint_row(row)["published_at"].tzinfo is None
+
+
+def test_build_article_row_defaults_to_now_in_utc():
+    before = datetime.now(timezone.utc).replace(tzinfo=None)
+    row = build_article_row(Article(title="Title", url="https://example.com/a"))
+    assert row["published_at"].tzinfo is None
+    assert before <= row["published_at"] <= datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def test_build_article_row_rejects_articles_without_url_or_title():
+    assert build_article_row(Article(title=None, url="https://example.com/a")) is None
+    assert build_article_row(Article(title="Title", url=None)) is None
@@ -0,0 +1,32 @@
+import asyncio
+
+from app.database.database import async_engine
+from app.database.migrate import migrate
+from app.jobs import JobRunner, JobStore
+
+
+async def _noop():
+    return {"saved": 0}
+
+
+def test_job_store_keeps_only_recent_history():
+    migrate()
+    store = JobStore(history_limit=3)
+    runner = JobRunner(store=store)
+
+    async def run():
+        ids = []
+        for _ in range(5):
+            job = runner.submit("prune-test", _noop)
+            await job.wait()
+            ids.append(job.id)
+        stored = [job["id"] for job in await store.recent(10)]
+        other = JobRunner(store=store)
+        snapshot = await other.lookup(ids[-1])
+        await async_engine.dispose()
+        return ids, stored, snapshot
+
+    ids, stored, snapshot = asyncio.run(run())
+    assert stored == list(reversed(ids[-3:]))
+    assert snapshot["status"] == "succeeded"
+    assert snapshot["result"] == {"saved": 0}
@@ -0,0 +1,63 @@
+import asyncio
+
+from app import locks
+from app.routers import news_scheduler
+
+
+class FakeScheduler:
+    def __init__(self):
+        self.running = False
+        self.starts = 0
+        self.shutdowns = 0
+
+    def start(self):
+        assert not self.running, "two leaders at once"
+        self.running = True
+        self.starts += 1
+
+    def shutdown(self, wait=True):
+        self.running = False
+        self.shutdowns += 1
+
+
+def test_leader_stops_scheduler_when_lock_is_lost(monkeypatch):
+    fake = FakeScheduler()
+    lost = asyncio.Event()
+
+    async def alive(self):
+        if lost.is_set():  # one failed check, as after a dropped connection
+            lost.clear()
+            return False
+        return self.acquired
+
+    monkeypatch.setattr(locks, "JOB_LOCK_BACKEND", "file")
+    monkeypatch.setattr(locks.JobLock, "alive", alive)
+    monkeypatch.setattr(news_scheduler, "scheduler", fake)
+    monkeypatch.setattr(news_scheduler, "start_scheduler", fake.start)
+    monkeypatch.setattr(news_scheduler, "SCHEDULER_LEADER_CHECK_SECONDS", 0.01)
+    monkeypatch.setattr(news_scheduler, "SCHEDULER_LEADER_RETRY_SECONDS", 0.01)
+
+    async def wait_for(condition):
+        for _ in range(500):
+            if condition():
+                return
+            await asyncio.sleep(0.01)
+        raise AssertionError("timed out")
+
+    async def run():
+        contenders = [asyncio.create_task(news_scheduler.lead_scheduler()) for _ in range(2)]
+        try:
+            await wait_for(lambda: fake.running)
+            await asyncio.sleep(0.05)  # the other contender keeps retrying
+            assert fake.starts == 1
+
+            lost.set()
+            await wait_for(lambda: fake.starts == 2)
+            assert fake.shutdowns == 1
+            assert fake.running
+        finally:
+            for task in contenders:
+                task.cancel()
+            await asyncio.gather(*contenders, return_exceptions=True)
+
+    asyncio.run(run())
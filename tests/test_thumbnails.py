@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from app import thumbnails
+from app.thumbnails import ThumbnailCache, ThumbnailUnavailable
+
+URL = "https://example.com/missing.jpg"
+
+
+@pytest.fixture
+def failing_fetch(monkeypatch):
+    calls = []
+
+    async def fetch(url):
+        calls.append(url)
+        raise ValueError("404 Not Found")
+
+    monkeypatch.setattr(thumbnails, "fetch", fetch)
+    return calls
+
+
+def test_failed_image_is_not_refetched(tmp_path, failing_fetch):
+    cache = ThumbnailCache(directory=str(tmp_path))
+
+    async def run():
+        with pytest.raises(ValueError):
+            await cache.get(URL, 320, "webp")
+        with pytest.raises(ThumbnailUnavailable):
+            await cache.get(URL, 640, "jpeg")
+
+    asyncio.run(run())
+    assert failing_fetch == [URL]
+    assert cache.stats()["negative_hits"] == 1
+    assert cache.stats()["failures"] == 1
+
+
+def test_failed_image_is_retried_after_ttl(tmp_path, failing_fetch, monkeypatch):
+    monkeypatch.setattr(thumbnails, "THUMB_FAILURE_TTL", 0)
+    cache = ThumbnailCache(directory=str(tmp_path))
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                await cache.ensure(URL)
+
+    asyncio.run(run())
+    assert failing_fetch == [URL, URL]